@@ -0,0 +1,135 @@
+"""Audio backends behind one interface.
+
+model.py asks openAudioEngine() for an engine and only uses its play,
+preroll, cancel, stop, stopAll, isPrerolled, getTime, onPlaying,
+setGain/duck/unduck and release, plus .media for the clip registry. Pick with SB_AUDIO=vlc|pcm
+(default vlc):
+  - vlc: audio_engine.AudioEngine, libVLC reading the mp3s
+  - pcm: pcm_audio.PcmAudioEngine, every clip decoded into memory once
+    and mixed into SB_AUDIO_SINK=alsa|null|wav:<path> (default alsa)
+
+Both share PlaybackTracker, so end-of-clip callbacks behave the same:
+play() returns a Playback handle whose onEnd runs once, on the Qt thread,
+unless the handle is cancelled, the player is stopped, or something else
+is played on that player first.
+
+Gain is per player and outlives the clip, so a ducked line stays ducked
+from hello to convo. pcm ramps it from a given sample of the clip; VLC
+has no mixer of its own and ducks with each player's audio_set_volume,
+right away. The game rings one call at a time, so it doesn't duck
+anything yet; audio_bench.py exercises the path.
+"""
+import os
+import threading
+
+from content_bundle import AUDIO_DIR
+from scheduler import scheduler
+
+# Gain of a line held under another call, 1.0 being as recorded
+DUCK_GAIN = 0.2
+# Short enough to sound immediate, long enough not to click
+RAMP_MS = 20
+
+
+def openAudioEngine(playerNames, name=None, audioDir=AUDIO_DIR):
+    if name is None:
+        name = os.environ.get("SB_AUDIO", "vlc")
+    # Imported here so neither backend needs the other's libraries
+    if name == "vlc":
+        from audio_engine import AudioEngine
+        return AudioEngine(playerNames, audioDir)
+    if name == "pcm":
+        from pcm_audio import PcmAudioEngine, openSink
+        return PcmAudioEngine(playerNames, audioDir,
+                              sink=openSink(os.environ.get("SB_AUDIO_SINK", "alsa")))
+    raise ValueError(f"unknown audio backend: {name}")
+
+
+class Playback:
+    """One play of one clip. cancel() drops the end callback."""
+    __slots__ = ("playerName", "key", "onEnd", "args", "cancelled", "done")
+
+    def __init__(self, playerName, key, onEnd, args):
+        self.playerName = playerName
+        self.key = key
+        self.onEnd = onEnd
+        self.args = args
+        self.cancelled = False
+        self.done = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    @property
+    def isActive(self):
+        return not (self.cancelled or self.done)
+
+
+class PlaybackTracker:
+    """Playback handles and pre-roll state per player name.
+
+    The backend reports a clip's end from its own thread. The handle it
+    picks there may already belong to a clip play() started after the
+    end, so _complete also asks the backend (_playerEnded) whether the
+    player really is at the end before running onEnd.
+    """
+    def __init__(self):
+        # Playback handle for what each player is playing now. Read from
+        # the backend's thread, so swapped under currentLock
+        self.current = {}
+        self.currentLock = threading.Lock()
+        # Key each player is holding paused at zero, waiting for play()
+        self.prerolled = {}
+
+    def _newPlayback(self, playerName, key, onEnd, args):
+        playback = Playback(playerName, key, onEnd, args)
+        with self.currentLock:
+            previous = self.current.get(playerName)
+            if previous is not None:
+                previous.cancel()
+            self.current[playerName] = playback
+        return playback
+
+    def duck(self, playerName, gain=DUCK_GAIN, rampMs=RAMP_MS, atMs=None):
+        self.setGain(playerName, gain, rampMs, atMs)
+
+    def unduck(self, playerName, rampMs=RAMP_MS, atMs=None):
+        self.setGain(playerName, 1.0, rampMs, atMs)
+
+    def isPrerolled(self, playerName):
+        return playerName in self.prerolled
+
+    def cancel(self, playerName):
+        """Forget the end callback but leave the audio playing."""
+        with self.currentLock:
+            playback = self.current.get(playerName)
+            if playback is not None:
+                playback.cancel()
+                self.current[playerName] = None
+
+    def _endReached(self, playerName):
+        # Backend thread -- only pick the handle and pass it on
+        with self.currentLock:
+            playback = self.current.get(playerName)
+        if playback is not None:
+            scheduler.callSoon(self._complete, playback)
+
+    def _playerEnded(self, playerName):
+        """Qt thread: is the player stopped at the end of its clip, rather
+        than playing one started since? Backends override this.
+        """
+        return True
+
+    def _complete(self, playback):
+        # Qt thread. Still the player's current play, not cancelled, and
+        # the player at its end means the end is this play's and hasn't
+        # been reported yet. Asked outside the lock -- it calls the backend
+        ended = self._playerEnded(playback.playerName)
+        with self.currentLock:
+            if (not ended or not playback.isActive or
+                    self.current.get(playback.playerName) is not playback):
+                return
+            playback.done = True
+            self.current[playback.playerName] = None
+        if playback.onEnd is not None:
+            playback.onEnd(*playback.args)
@@ -0,0 +1,227 @@
+"""Audio start and stop latency for every clip the game plays.
+
+For each clip named in conversations.json / persons.json plus the fixed
+clips (buzzer, ring tone, Welcome, FinishedActivity) it times play() to
+first audio (MediaPlayerPlaying on VLC, the first block handed to the
+sink on pcm) and stop() to silence, three ways:
+  - cold:      Media (or decoded clip) created at play time
+  - cached:    from the startup registry
+  - prerolled: opened and paused at zero beforehand, play() resumes
+then, with the clip also playing on a second player over it, times
+duck() and unduck() to the new gain reaching the sink -- the mix the
+game makes when a call is answered over one already connected. It
+writes a json report with sorted keys, so runs on different releases
+or hardware revisions can be diffed.
+
+    python audio_bench.py --backend vlc --out bench-vlc.json
+    SB_AUDIO_SINK=null python audio_bench.py --backend pcm --out bench-pcm.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import threading
+import time
+
+from PyQt5 import QtCore as qtc
+
+from audio_backend import openAudioEngine
+from content_bundle import AUDIO_DIR, contentClipNames, loadContent
+
+MODES = ("cold", "cached", "prerolled")
+PLAYER = "bench"
+# Plays over PLAYER while it is ducked
+OVER_PLAYER = "bench-over"
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def summarize(values):
+    if not values:
+        return None
+    return {"n": len(values), "min": round(min(values), 2),
+            "median": round(statistics.median(values), 2),
+            "p95": round(percentile(values, 95), 2), "max": round(max(values), 2)}
+
+
+def hostInfo():
+    info = {"platform": platform.platform(), "machine": platform.machine(),
+            "python": platform.python_version()}
+    # Board model on a Pi, e.g. "Raspberry Pi 4 Model B Rev 1.4"
+    try:
+        with open("/proc/device-tree/model") as f:
+            info["board"] = f.read().rstrip("\0\n")
+    except OSError:
+        pass
+    return info
+
+
+class Bench:
+    def __init__(self, engine, timeoutS, holdMs, settleMs):
+        self.engine = engine
+        self.timeoutS = timeoutS
+        self.holdMs = holdMs
+        self.settleMs = settleMs
+        self.playing = threading.Event()
+        engine.onPlaying(PLAYER, self.playing.set)
+
+    def startOnce(self, key, mode):
+        """ms from play() to first audio, None if it never started."""
+        if mode == "cold":
+            # Forget the startup copy -- play() creates a fresh one
+            self.engine.media.release(key)
+        elif mode == "prerolled":
+            self.engine.preroll(PLAYER, key)
+            time.sleep(self.settleMs / 1000)
+        self.playing.clear()
+        startTime = time.perf_counter()
+        self.engine.play(PLAYER, key)
+        if not self.playing.wait(self.timeoutS):
+            return None
+        return (time.perf_counter() - startTime) * 1000
+
+    def timeToSink(self, action, *args):
+        """ms from action(*args) to the first block mixed after it."""
+        blocks = getattr(self.engine, "blocksWritten", None)
+        startTime = time.perf_counter()
+        action(*args)
+        if blocks is not None:
+            # pcm: the block being written when the call landed predates it
+            while self.engine.blocksWritten <= blocks:
+                time.sleep(0.0005)
+        # vlc: stop() returns once the output is closed, the volume is set
+        # straight away
+        return (time.perf_counter() - startTime) * 1000
+
+    def stopOnce(self):
+        """ms from stop() to silence."""
+        return self.timeToSink(self.engine.stop, PLAYER)
+
+    def duckOnce(self, key):
+        """(duck ms, unduck ms) with key on both players, None if it
+        never started.
+        """
+        self.playing.clear()
+        self.engine.play(PLAYER, key)
+        if not self.playing.wait(self.timeoutS):
+            self.engine.stop(PLAYER)
+            return None
+        self.engine.play(OVER_PLAYER, key)
+        time.sleep(self.holdMs / 2000)
+        duckMs = self.timeToSink(self.engine.duck, PLAYER)
+        time.sleep(self.holdMs / 2000)
+        unduckMs = self.timeToSink(self.engine.unduck, PLAYER)
+        self.engine.stop(OVER_PLAYER)
+        self.engine.stop(PLAYER)
+        return duckMs, unduckMs
+
+    def run(self, keys, repeat):
+        clips = {}
+        for key in keys:
+            clips[key] = {}
+            for mode in MODES:
+                starts, stops, failures = [], [], 0
+                for _ in range(repeat):
+                    startMs = self.startOnce(key, mode)
+                    if startMs is None:
+                        failures += 1
+                        self.engine.stop(PLAYER)
+                        continue
+                    starts.append(round(startMs, 2))
+                    time.sleep(self.holdMs / 1000)
+                    stops.append(round(self.stopOnce(), 2))
+                clips[key][mode] = {"startMs": starts, "stopMs": stops,
+                                    "failures": failures}
+            ducks, unducks, failures = [], [], 0
+            for _ in range(repeat):
+                times = self.duckOnce(key)
+                if times is None:
+                    failures += 1
+                    continue
+                ducks.append(round(times[0], 2))
+                unducks.append(round(times[1], 2))
+            clips[key]["duck"] = {"duckMs": ducks, "unduckMs": unducks,
+                                  "failures": failures}
+            print(f" - {key}: " + "  ".join(
+                f"{mode} {statistics.median(clips[key][mode]['startMs']):.1f}"
+                if clips[key][mode]["startMs"] else f"{mode} -" for mode in MODES))
+        return clips
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--backend", choices=("vlc", "pcm"),
+                        default=os.environ.get("SB_AUDIO", "vlc"))
+    parser.add_argument("--audio-dir", default=AUDIO_DIR)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--hold-ms", type=float, default=150,
+                        help="how long each clip plays before stop()")
+    parser.add_argument("--settle-ms", type=float, default=400,
+                        help="time given to a pre-roll before play()")
+    parser.add_argument("--timeout", type=float, default=5.0)
+    parser.add_argument("--only", nargs="*", help="just these clip keys")
+    parser.add_argument("--out", default="audio-bench.json")
+    args = parser.parse_args()
+
+    # The engines' end-of-clip scheduler is a QObject
+    app = qtc.QCoreApplication([])
+
+    content = loadContent()
+    keys = args.only or contentClipNames(content.conversations, content.persons)
+    setupStart = time.perf_counter()
+    engine = openAudioEngine((PLAYER, OVER_PLAYER), args.backend, args.audio_dir)
+    for key in keys:
+        engine.media.get(key)
+    setupMs = (time.perf_counter() - setupStart) * 1000
+    print(f" * {args.backend}: {len(keys)} clips ready in {setupMs:.0f} ms")
+
+    bench = Bench(engine, args.timeout, args.hold_ms, args.settle_ms)
+    clips = bench.run(keys, args.repeat)
+    report = {
+        "generatedAt": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "backend": args.backend,
+        "sink": os.environ.get("SB_AUDIO_SINK", "alsa") if args.backend == "pcm" else None,
+        "host": hostInfo(),
+        "contentVersion": content.contentVersion,
+        "audioDir": args.audio_dir,
+        "repeat": args.repeat,
+        "setupMs": round(setupMs, 1),
+        "missing": sorted(set(engine.media.missing)),
+        "clips": clips,
+        "summary": {mode: {
+            "startMs": summarize([ms for clip in clips.values() for ms in clip[mode]["startMs"]]),
+            "stopMs": summarize([ms for clip in clips.values() for ms in clip[mode]["stopMs"]]),
+            "failures": sum(clip[mode]["failures"] for clip in clips.values()),
+        } for mode in MODES},
+    }
+    report["summary"]["duck"] = {
+        "duckMs": summarize([ms for clip in clips.values() for ms in clip["duck"]["duckMs"]]),
+        "unduckMs": summarize([ms for clip in clips.values() for ms in clip["duck"]["unduckMs"]]),
+        "failures": sum(clip["duck"]["failures"] for clip in clips.values()),
+    }
+    # Run any end callbacks the scheduler still has queued before the
+    # players they refer to are released
+    app.processEvents()
+    engine.release()
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    for mode in MODES:
+        start = report["summary"][mode]["startMs"]
+        if start:
+            print(f"{mode:>9} start ms: median {start['median']:.1f} p95 {start['p95']:.1f} "
+                  f"max {start['max']:.1f}")
+    duck = report["summary"]["duck"]
+    if duck["duckMs"]:
+        print(f"     duck ms: median {duck['duckMs']['median']:.1f} p95 {duck['duckMs']['p95']:.1f}"
+              f"  unduck ms: median {duck['unduckMs']['median']:.1f}")
+    print(f" * wrote {args.out}")
+    return 1 if any(report["summary"][name]["failures"] for name in report["summary"]) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,136 @@
+"""One libVLC instance shared by every player in the game.
+
+Each vlc.Instance() loads the full plugin set and starts its own threads,
+so rather than one instance per player the engine owns a single instance,
+a pool of named players (buzzer, tone, one per voice line) and the media
+registry for that instance.
+
+play() and its Playback handles work as described in audio_backend.py;
+the engine attaches MediaPlayerEndReached once per player so callers never
+attach or detach it themselves. The end is only reported if the player is
+still in the Ended state when the Qt thread gets it.
+
+preroll(playerName, key) opens a clip and holds it paused at the start
+(decoder and output already up), so the play() that follows -- typically
+from the end of the ring tone -- is just a resume.
+
+Thread ownership:
+  - The engine and its players are created and driven from the Qt thread.
+  - Player event callbacks (event_attach) run on libVLC's event thread.
+    They may control a *different* player, but must not call into the
+    player that raised the event (libVLC deadlocks) and must not start
+    QTimers. The engine's own EndReached handler only hands the handle to
+    the scheduler, so onEnd callbacks are free of both restrictions.
+"""
+import vlc
+
+from audio_backend import PlaybackTracker, RAMP_MS
+from media_cache import MediaRegistry, AUDIO_DIR
+
+
+class AudioEngine(PlaybackTracker):
+    def __init__(self, playerNames, audioDir=AUDIO_DIR):
+        super().__init__()
+        self.instance = vlc.Instance()
+        self.media = MediaRegistry(self.instance, audioDir)
+        self.players = {}
+        self.events = {}
+        # Start-paused copies of registry media a player is holding
+        self.ownedMedia = {}
+        for name in playerNames:
+            self.addPlayer(name)
+
+    def addPlayer(self, name):
+        player = self.instance.media_player_new()
+        self.players[name] = player
+        self.events[name] = player.event_manager()
+        self.current[name] = None
+        # Attached once for the life of the player
+        self.events[name].event_attach(vlc.EventType.MediaPlayerEndReached,
+            self._vlcEndReached, name)
+        return player
+
+    def player(self, name):
+        return self.players[name]
+
+    def play(self, playerName, key, onEnd=None, *args):
+        """Play clip key (None: the player's current media) and return its
+        Playback handle. Replaces whatever the player had going, along
+        with that play's end callback.
+        """
+        playback = self._newPlayback(playerName, key, onEnd, args)
+        player = self.players[playerName]
+        prerolledKey = self.prerolled.pop(playerName, None)
+        if key is not None and key != prerolledKey:
+            player.set_media(self.media.get(key))
+            self._releaseOwned(playerName)
+        # Starts, or resumes the pre-rolled clip
+        player.play()
+        return playback
+
+    def preroll(self, playerName, key):
+        """Open key on playerName and leave it paused at zero until
+        play(playerName, key).
+        """
+        self.stop(playerName)
+        # A copy, so the start-paused option stays off the registry's media
+        media = self.media.get(key).duplicate()
+        media.add_option(":start-paused")
+        player = self.players[playerName]
+        player.set_media(media)
+        self._releaseOwned(playerName)
+        self.ownedMedia[playerName] = media
+        self.prerolled[playerName] = key
+        player.play()
+
+    def _releaseOwned(self, playerName):
+        media = self.ownedMedia.pop(playerName, None)
+        if media is not None:
+            media.release()
+
+    def stop(self, playerName):
+        self.cancel(playerName)
+        self.prerolled.pop(playerName, None)
+        self.players[playerName].stop()
+
+    def getTime(self, playerName):
+        # ms into the player's clip, -1 when idle
+        return self.players[playerName].get_time()
+
+    def onPlaying(self, playerName, callback):
+        """callback() when the player starts or resumes producing audio,
+        on libVLC's event thread.
+        """
+        self.events[playerName].event_attach(vlc.EventType.MediaPlayerPlaying,
+            lambda event: callback())
+
+    def _vlcEndReached(self, event, playerName):
+        self._endReached(playerName)
+
+    def _playerEnded(self, playerName):
+        # set_media and play() move the state off Ended, so a late end
+        # event for the previous clip is told apart here
+        player = self.players.get(playerName)
+        return player is not None and player.get_state() == vlc.State.Ended
+
+    def stopAll(self):
+        for name in self.players:
+            self.stop(name)
+            self.players[name].audio_set_volume(100)
+
+    def setGain(self, playerName, gain, rampMs=RAMP_MS, atMs=None):
+        # libVLC has no ramp or sample position -- the volume just changes
+        self.players[playerName].audio_set_volume(int(round(max(0.0, gain) * 100)))
+
+    def release(self):
+        """At shutdown: players first, then their media, then libVLC."""
+        self.stopAll()
+        for player in self.players.values():
+            player.release()
+        self.players.clear()
+        self.events.clear()
+        self.current.clear()
+        for name in list(self.ownedMedia):
+            self._releaseOwned(name)
+        self.media.releaseAll()
+        self.instance.release()
@@ -0,0 +1,162 @@
+"""The whole switchboard as a few ints, one bit per jack or LED.
+
+  plugged   jacks with a plug in, from control.py's debounced edges
+  unsettled jacks whose contacts have changed but not settled yet
+  inUse     jacks the model has taken into a call (was Model.pinsIn)
+  lit       LEDs that should be on -- control.py writes it to the LED chip
+  blinking  LEDs the blink timer toggles
+  lines     jacks on each phone line (caller and callee), one mask per line,
+            with jackLine mapping each of those jacks back to its line
+
+Set/clear/test/any are single bit operations and a whole-board check is
+one compare, e.g. "any plugs left in?" is plugged != 0. snapshot() freezes
+the state and diff() says which bits changed between two snapshots.
+
+control.py and model.py share the module's `board`, and only touch it on
+the Qt thread.
+"""
+from collections import namedtuple
+
+
+def popcount(mask):
+    return bin(mask).count("1")
+
+
+def bitIndexes(mask):
+    """Indexes of the set bits, lowest first."""
+    idx = 0
+    while mask:
+        if mask & 1:
+            yield idx
+        mask >>= 1
+        idx += 1
+
+
+def withBit(mask, idx, on):
+    return mask | (1 << idx) if on else mask & ~(1 << idx)
+
+
+class BoardSnapshot(namedtuple("BoardSnapshot", "plugged inUse lit blinking lines")):
+    __slots__ = ()
+
+    def diff(self, earlier):
+        """{field: (bits turned on, bits turned off)} for what changed
+        since earlier. lines is compared line by line as "line0" etc.
+        """
+        changes = {}
+        for field in ("plugged", "inUse", "lit", "blinking"):
+            before, after = getattr(earlier, field), getattr(self, field)
+            if before != after:
+                changes[field] = (after & ~before, before & ~after)
+        for lineIdx, (before, after) in enumerate(zip(earlier.lines, self.lines)):
+            if before != after:
+                changes[f"line{lineIdx}"] = (after & ~before, before & ~after)
+        return changes
+
+
+class BoardState:
+    def __init__(self, lineCount=1):
+        self.lineCount = lineCount
+        self.plugged = 0
+        self.unsettled = 0
+        self.reset()
+
+    def reset(self):
+        """Everything but plugged, which follows the hardware."""
+        self.resetCalls()
+        self.resetOutputs()
+
+    def setLineCount(self, lineCount):
+        self.lineCount = lineCount
+        self.resetCalls()
+
+    def resetCalls(self):
+        self.inUse = 0
+        self.lines = [0] * self.lineCount
+        # jack -> line, so lineOf doesn't depend on the number of lines
+        self.jackLine = {}
+
+    def resetOutputs(self):
+        self.lit = 0
+        self.blinking = 0
+
+    # --- jacks ---
+    def setPlugged(self, jackIdx, on):
+        self.plugged = withBit(self.plugged, jackIdx, on)
+
+    def setPluggedMask(self, mask):
+        self.plugged = mask
+
+    def setUnsettled(self, mask):
+        self.unsettled = mask
+
+    def isPlugged(self, jackIdx):
+        return bool((self.plugged >> jackIdx) & 1)
+
+    def anyPlugged(self):
+        return self.plugged != 0
+
+    def pluggedCount(self):
+        return popcount(self.plugged)
+
+    def setInUse(self, jackIdx, on):
+        self.inUse = withBit(self.inUse, jackIdx, on)
+
+    def isInUse(self, jackIdx):
+        return bool((self.inUse >> jackIdx) & 1)
+
+    # --- LEDs ---
+    def setLit(self, ledIdx, on):
+        self.lit = withBit(self.lit, ledIdx, on)
+
+    def setLitMask(self, mask, on):
+        self.lit = self.lit | mask if on else self.lit & ~mask
+
+    def isLit(self, ledIdx):
+        return bool((self.lit >> ledIdx) & 1)
+
+    def setBlinking(self, ledIdx, on):
+        self.blinking = withBit(self.blinking, ledIdx, on)
+
+    def stopBlinking(self):
+        self.blinking = 0
+
+    def blink(self):
+        # One blink step for every blinking LED
+        self.lit ^= self.blinking
+
+    # --- lines ---
+    def addToLine(self, lineIdx, jackIdx):
+        # A jack is only ever on one line
+        prevIdx = self.jackLine.get(jackIdx, lineIdx)
+        self.lines[prevIdx] &= ~(1 << jackIdx)
+        self.lines[lineIdx] |= 1 << jackIdx
+        self.jackLine[jackIdx] = lineIdx
+
+    def removeFromLine(self, lineIdx, jackIdx):
+        self.lines[lineIdx] &= ~(1 << jackIdx)
+        if self.jackLine.get(jackIdx) == lineIdx:
+            del self.jackLine[jackIdx]
+
+    def lineMask(self, lineIdx):
+        return self.lines[lineIdx]
+
+    def lineOf(self, jackIdx):
+        """Line the jack is on, -1 if none."""
+        return self.jackLine.get(jackIdx, -1)
+
+    def clearLine(self, lineIdx):
+        """Empty the line, returning the jacks that were on it."""
+        mask = self.lines[lineIdx]
+        self.lines[lineIdx] = 0
+        for jackIdx in bitIndexes(mask):
+            self.jackLine.pop(jackIdx, None)
+        return mask
+
+    def snapshot(self):
+        return BoardSnapshot(self.plugged, self.inUse, self.lit, self.blinking,
+                             tuple(self.lines))
+
+
+# Shared by control.py and model.py
+board = BoardState()
@@ -0,0 +1,150 @@
+"""Validate the game content and compile it into content.sbb.
+
+Checks that every clip referenced by conversations.json and persons.json
+(plus the fixed clips) exists in the audio folder, that every hello and
+convo file has captions, and that caller/callee indexes point at real
+persons -- so a missing asset fails here, not in the middle of a visit.
+Audio durations are measured with libVLC, and each okTimeHello and
+okTimeConvo must fall inside its clip.
+
+    python build_bundle.py [--audio-dir DIR] [--out content.sbb] [--no-durations]
+
+Exits non-zero, without writing a bundle, if anything is wrong.
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+
+from captions import loadCaptionTables
+from content_bundle import (APP_DIR, AUDIO_DIR, BUNDLE_PATH, contentClipNames, sourceDigest,
+                            sourceStats, writeBundle)
+
+# Every conversation needs these, the rest are optional
+REQUIRED_CONVERSATION_KEYS = ("caller", "callee", "helloFile", "okTimeHello", "okTimeConvo")
+
+
+def validateContent(conversations, persons, captionTables, audioDir):
+    problems = []
+    for convoIdx, conversation in enumerate(conversations):
+        for key in REQUIRED_CONVERSATION_KEYS:
+            if key not in conversation:
+                problems.append(f"conversation {convoIdx}: no {key}")
+        for role in ("caller", "callee"):
+            personIdx = conversation.get(role, {}).get("index")
+            if not isinstance(personIdx, int) or not 0 <= personIdx < len(persons):
+                problems.append(f"conversation {convoIdx}: {role} index {personIdx} is not a person")
+        if conversation.get("helloFile") and conversation["helloFile"] not in captionTables["hello"]:
+            problems.append(f"conversation {convoIdx}: no captions/hello/{conversation['helloFile']}.srt")
+        if conversation.get("convoFile") and conversation["convoFile"] not in captionTables["convo"]:
+            problems.append(f"conversation {convoIdx}: no captions/convo/{conversation['convoFile']}.srt")
+        if conversation.get("retryAfterWrongFile") and not conversation.get("retryAfterWrongText"):
+            problems.append(f"conversation {convoIdx}: retryAfterWrongFile without retryAfterWrongText")
+    for personIdx, person in enumerate(persons):
+        if person.get("wrongNumFile") and not person.get("wrongNumText"):
+            problems.append(f"person {personIdx}: wrongNumFile without wrongNumText")
+    for captionType, tables in captionTables.items():
+        for name, table in tables.items():
+            if len(table) == 0:
+                problems.append(f"captions/{captionType}/{name}.srt has no cues")
+            for cueIdx in range(len(table)):
+                if table.ends[cueIdx] < table.starts[cueIdx]:
+                    problems.append(f"captions/{captionType}/{name}.srt cue {cueIdx + 1} ends before it starts")
+                if cueIdx and table.starts[cueIdx] < table.starts[cueIdx - 1]:
+                    problems.append(f"captions/{captionType}/{name}.srt cue {cueIdx + 1} is out of order")
+    for clipName in contentClipNames(conversations, persons):
+        if not os.path.isfile(os.path.join(audioDir, clipName + ".mp3")):
+            problems.append(f"missing audio {clipName}.mp3 in {audioDir}")
+    return problems
+
+
+def measureDurations(clipNames, audioDir):
+    import vlc
+    instance = vlc.Instance("--quiet")
+    durations = {}
+    for clipName in clipNames:
+        media = instance.media_new_path(os.path.join(audioDir, clipName + ".mp3"))
+        media.parse_with_options(vlc.MediaParseFlag.local, 5000)
+        deadline = time.monotonic() + 6
+        while (media.get_parsed_status() == vlc.MediaParsedStatus.skipped or
+               media.get_parsed_status() == 0) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        durations[clipName] = media.get_duration()
+        media.release()
+    instance.release()
+    return durations
+
+
+def checkDurations(conversations, durations):
+    """okTimeHello/okTimeConvo are points in the hello and convo clips,
+    so they have to fall inside them. Clips libVLC couldn't measure
+    (-1) are skipped.
+    """
+    problems = []
+    for convoIdx, conversation in enumerate(conversations):
+        for fileKey, timeKey in (("helloFile", "okTimeHello"), ("convoFile", "okTimeConvo")):
+            durationMs = durations.get(conversation.get(fileKey), -1)
+            if durationMs > 0 and conversation[timeKey] >= durationMs:
+                problems.append(f"conversation {convoIdx}: {timeKey} {conversation[timeKey]} is past"
+                                f" the end of {conversation[fileKey]}.mp3 ({durationMs} ms)")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--audio-dir", default=AUDIO_DIR)
+    parser.add_argument("--out", default=BUNDLE_PATH)
+    parser.add_argument("--no-durations", action="store_true",
+                        help="skip libVLC duration measurement")
+    args = parser.parse_args()
+
+    sourceFiles = [os.path.join(APP_DIR, "conversations.json"), os.path.join(APP_DIR, "persons.json")]
+    with open(sourceFiles[0]) as f:
+        conversations = json.load(f)
+    with open(sourceFiles[1]) as f:
+        persons = json.load(f)
+    captionTables = loadCaptionTables(os.path.join(APP_DIR, "captions"))
+
+    problems = validateContent(conversations, persons, captionTables, args.audio_dir)
+    if problems:
+        print(f"{len(problems)} problem(s), no bundle written:")
+        for problem in problems:
+            print(f"  - {problem}")
+        sys.exit(1)
+
+    clipNames = contentClipNames(conversations, persons)
+    durations = {} if args.no_durations else measureDurations(clipNames, args.audio_dir)
+    problems = checkDurations(conversations, durations)
+    if problems:
+        print(f"{len(problems)} problem(s), no bundle written:")
+        for problem in problems:
+            print(f"  - {problem}")
+        sys.exit(1)
+    audio = {}
+    for clipName in clipNames:
+        path = os.path.join(args.audio_dir, clipName + ".mp3")
+        audio[clipName] = {"durationMs": durations.get(clipName, -1),
+                           "bytes": os.path.getsize(path)}
+
+    # Version is a hash of everything that went in
+    digest = hashlib.sha256()
+    for path in sourceFiles:
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    for captionType in sorted(captionTables):
+        for name in sorted(captionTables[captionType]):
+            table = captionTables[captionType][name]
+            digest.update(f"{captionType}/{name}{list(table.starts)}{list(table.ends)}{table.texts}".encode("utf-8"))
+    digest.update(json.dumps(audio, sort_keys=True).encode("utf-8"))
+    contentVersion = f"{time.strftime('%Y%m%d')}-{digest.hexdigest()[:12]}"
+
+    writeBundle(args.out, contentVersion, conversations, persons, captionTables, audio,
+                sourceDigest(APP_DIR), sourceStats(APP_DIR))
+    print(f"wrote {args.out}: version {contentVersion}, {len(conversations)} conversations, "
+          f"{sum(len(t) for t in captionTables.values())} caption files, {len(audio)} clips")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""Caption cue tables, parsed once at startup.
+
+Every .srt under captions/hello and captions/convo becomes a CueTable with
+start and end times as int ms arrays and the cue text already cleaned up,
+keyed by type and by the helloFile / convoFile names used in
+conversations.json. Starting captions for a call is then a dict lookup --
+no file I/O and no timestamp parsing on the GUI thread. cueIndexAt maps a
+playback time to its cue, so captions can follow the audio clock.
+"""
+import os
+from array import array
+from bisect import bisect_right
+
+CAPTION_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'captions')
+CAPTION_TYPES = ('hello', 'convo')
+
+
+def time_str_to_ms(time_str):
+    hours, minutes, seconds_ms = time_str.strip().split(':')
+    seconds, milliseconds = seconds_ms.split(',')
+    return int(hours) * 3600000 + int(minutes) * 60000 + int(seconds) * 1000 + int(milliseconds)
+
+
+class CueTable:
+    """Cues of one caption file in order. starts/ends are ms."""
+    __slots__ = ('starts', 'ends', 'texts')
+
+    def __init__(self, starts, ends, texts):
+        self.starts = starts
+        self.ends = ends
+        self.texts = texts
+
+    def __len__(self):
+        return len(self.texts)
+
+    def cueIndexAt(self, ms):
+        """Index of the cue showing at ms into the audio (the last one
+        that has started), -1 before the first. Binary search on starts.
+        """
+        return bisect_right(self.starts, ms) - 1
+
+
+def parseSrt(srtText):
+    starts = array('i')
+    ends = array('i')
+    texts = []
+    srtText = srtText.replace('\r\n', '\n').lstrip('\ufeff')
+    for block in srtText.split('\n\n'):
+        lines = [line.rstrip() for line in block.strip('\n').split('\n')]
+        # number, time, then one or more lines of text
+        if len(lines) < 3 or '-->' not in lines[1]:
+            continue
+        startStr, endStr = lines[1].split('-->')
+        starts.append(time_str_to_ms(startStr))
+        ends.append(time_str_to_ms(endStr))
+        texts.append('\n'.join(lines[2:]).strip())
+    return CueTable(starts, ends, tuple(texts))
+
+
+def loadCaptionTables(captionDir=CAPTION_DIR):
+    """{type: {file name without .srt: CueTable}}"""
+    tables = {}
+    for captionType in CAPTION_TYPES:
+        tables[captionType] = {}
+        typeDir = os.path.join(captionDir, captionType)
+        if not os.path.isdir(typeDir):
+            print(f" * no caption folder: {typeDir}")
+            continue
+        for fileName in sorted(os.listdir(typeDir)):
+            if not fileName.endswith('.srt'):
+                continue
+            with open(os.path.join(typeDir, fileName), 'r', encoding='utf-8') as f:
+                tables[captionType][fileName[:-4]] = parseSrt(f.read())
+    return tables
@@ -0,0 +1,297 @@
+"""Compiled content bundle: conversations, persons, caption cues and audio
+metadata in one versioned binary file (content.sbb), built and validated
+ahead of time by build_bundle.py.
+
+Layout, all little-endian:
+    header   magic "SBCB", format version (u16), reserved (u16),
+             index offset (u64), index length (u64)
+    data     json sections, cue start/end arrays (i32), text offset
+             arrays (u32) and utf-8 cue text, each 4-byte aligned
+    index    json: content version, source digest and stats, section
+             offsets, per-caption-file offsets, audio durations
+
+The runtime mmaps the file and only decodes what it touches: the index at
+open, a json section on first access, a cue table the first time it is
+asked for. Cue times are served straight out of the mapping.
+
+loadContent() returns the bundle when content.sbb exists and was built
+from the json and .srt files now on disk (same sizes and mtimes, or
+failing that the same sourceDigest), otherwise the same interface read
+from those source files. The audio durations are for build_bundle.py's
+checks; nothing reads them at runtime.
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+from captions import CAPTION_TYPES, CueTable, loadCaptionTables
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+BUNDLE_PATH = os.path.join(APP_DIR, 'content.sbb')
+MAGIC = b'SBCB'
+FORMAT_VERSION = 1
+_HEADER = struct.Struct('<4sHHQQ')
+
+AUDIO_DIR = '/home/piswitch/Apps/sb-audio/'
+# Clips that aren't named in the json files
+FIXED_CLIPS = ('buzzer', 'outgoing-ring', 'Welcome', 'FinishedActivity')
+CONVERSATION_FILE_KEYS = ('helloFile', 'convoFile', 'retryAfterWrongFile')
+PERSON_FILE_KEYS = ('wrongNumFile',)
+
+
+def contentClipNames(conversations, persons):
+    """Every clip name referenced by the content, in a stable order."""
+    names = list(FIXED_CLIPS)
+    for conversation in conversations:
+        for fileKey in CONVERSATION_FILE_KEYS:
+            if conversation.get(fileKey):
+                names.append(conversation[fileKey])
+    for person in persons:
+        for fileKey in PERSON_FILE_KEYS:
+            if person.get(fileKey):
+                names.append(person[fileKey])
+    # Drop repeats but keep order
+    return list(dict.fromkeys(names))
+
+
+def _sourceFiles(appDir):
+    """Paths, relative to appDir, of the files a bundle is built from."""
+    sourceFiles = ['conversations.json', 'persons.json']
+    for captionType in CAPTION_TYPES:
+        typeDir = os.path.join(appDir, 'captions', captionType)
+        if os.path.isdir(typeDir):
+            sourceFiles.extend(os.path.join('captions', captionType, fileName)
+                               for fileName in sorted(os.listdir(typeDir))
+                               if fileName.endswith('.srt'))
+    return sourceFiles
+
+
+def sourceStats(appDir=APP_DIR):
+    """{relPath: [size, mtime_ns]} of the source files, or None if they
+    aren't there. Cheap enough for every boot -- only a mismatch here
+    costs a sourceDigest().
+    """
+    stats = {}
+    for relPath in _sourceFiles(appDir):
+        try:
+            st = os.stat(os.path.join(appDir, relPath))
+        except FileNotFoundError:
+            if relPath.endswith('.json'):
+                return None
+            raise
+        stats[relPath] = [st.st_size, st.st_mtime_ns]
+    return stats
+
+
+def sourceDigest(appDir=APP_DIR):
+    """sha256 of the files a bundle is built from, or None if they aren't
+    there (an install that only has content.sbb).
+    """
+    digest = hashlib.sha256()
+    for relPath in _sourceFiles(appDir):
+        try:
+            with open(os.path.join(appDir, relPath), 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            if relPath.endswith('.json'):
+                return None
+            raise
+        # Name too, so a renamed caption file changes the digest
+        digest.update(f"{relPath}\0{len(data)}\0".encode('utf-8'))
+        digest.update(data)
+    return digest.hexdigest()
+
+
+class BundleError(Exception):
+    pass
+
+
+def _intArray(typecode, buf):
+    values = array(typecode)
+    values.frombytes(buf)
+    if sys.byteorder != 'little':
+        values.byteswap()
+    return values
+
+
+def _leBytes(values):
+    if sys.byteorder != 'little':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def writeBundle(path, contentVersion, conversations, persons, captionTables, audio,
+                sourceHash=None, sourceStat=None):
+    """audio: {clip name: {"durationMs": int, "bytes": int}}. sourceHash
+    and sourceStat are sourceDigest() and sourceStats() of the files the
+    content was read from.
+    """
+    body = bytearray()
+
+    def addBlock(data):
+        # Keep every block 4-byte aligned so arrays cast cleanly
+        body.extend(b'\0' * (-(_HEADER.size + len(body)) % 4))
+        offset = _HEADER.size + len(body)
+        body.extend(data)
+        return [offset, len(data)]
+
+    index = {
+        'contentVersion': contentVersion,
+        'sourceDigest': sourceHash,
+        'sourceStats': sourceStat,
+        'sections': {
+            'conversations': addBlock(json.dumps(conversations).encode('utf-8')),
+            'persons': addBlock(json.dumps(persons).encode('utf-8')),
+        },
+        'captions': {},
+        'audio': audio,
+    }
+    for captionType, tables in captionTables.items():
+        index['captions'][captionType] = {}
+        for name, table in tables.items():
+            encoded = [text.encode('utf-8') for text in table.texts]
+            textOffsets = array('I', [0])
+            for text in encoded:
+                textOffsets.append(textOffsets[-1] + len(text))
+            index['captions'][captionType][name] = {
+                'count': len(table),
+                'starts': addBlock(_leBytes(array('i', table.starts))),
+                'ends': addBlock(_leBytes(array('i', table.ends))),
+                'textOffsets': addBlock(_leBytes(textOffsets)),
+                'text': addBlock(b''.join(encoded)),
+            }
+    indexBytes = json.dumps(index).encode('utf-8')
+    indexOffset = _HEADER.size + len(body)
+    tmpPath = path + '.tmp'
+    with open(tmpPath, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, 0, indexOffset, len(indexBytes)))
+        f.write(body)
+        f.write(indexBytes)
+    # Never leave a half-written bundle where the app would load it
+    os.replace(tmpPath, path)
+
+
+class LazyCueTables:
+    """Cue tables of one caption type, decoded from the mapping on first
+    use. Same get() as the plain dict loadCaptionTables returns.
+    """
+    def __init__(self, bundle, entries):
+        self.bundle = bundle
+        self.entries = entries
+        self.tables = {}
+
+    def get(self, name, default=None):
+        table = self.tables.get(name)
+        if table is None:
+            entry = self.entries.get(name)
+            if entry is None:
+                return default
+            table = self.tables[name] = self.bundle._cueTable(entry)
+        return table
+
+    def __getitem__(self, name):
+        table = self.get(name)
+        if table is None:
+            raise KeyError(name)
+        return table
+
+    def __contains__(self, name):
+        return name in self.entries
+
+    def keys(self):
+        return self.entries.keys()
+
+
+class ContentBundle:
+    def __init__(self, path=BUNDLE_PATH):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, formatVersion, _reserved, indexOffset, indexLength = \
+            _HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC:
+            raise BundleError(f"{path} is not a content bundle")
+        if formatVersion != FORMAT_VERSION:
+            raise BundleError(f"{path} is format {formatVersion}, expected {FORMAT_VERSION}")
+        self.index = json.loads(self.data[indexOffset:indexOffset + indexLength])
+        self.contentVersion = self.index['contentVersion']
+        self.sourceDigest = self.index.get('sourceDigest')
+        self.sourceStats = self.index.get('sourceStats')
+        self._sections = {}
+        self.captionTables = {captionType: LazyCueTables(self, entries)
+                              for captionType, entries in self.index['captions'].items()}
+
+    def _block(self, offsetLength):
+        offset, length = offsetLength
+        return self.data[offset:offset + length]
+
+    def _section(self, name):
+        if name not in self._sections:
+            self._sections[name] = json.loads(self._block(self.index['sections'][name]))
+        return self._sections[name]
+
+    @property
+    def conversations(self):
+        return self._section('conversations')
+
+    @property
+    def persons(self):
+        return self._section('persons')
+
+    def _cueTable(self, entry):
+        if sys.byteorder == 'little':
+            # Read cue times straight from the mapping
+            starts = memoryview(self.data)[entry['starts'][0]:sum(entry['starts'])].cast('i')
+            ends = memoryview(self.data)[entry['ends'][0]:sum(entry['ends'])].cast('i')
+        else:
+            starts = _intArray('i', self._block(entry['starts']))
+            ends = _intArray('i', self._block(entry['ends']))
+        textOffsets = _intArray('I', self._block(entry['textOffsets']))
+        text = self._block(entry['text'])
+        texts = tuple(text[textOffsets[i]:textOffsets[i + 1]].decode('utf-8')
+                      for i in range(entry['count']))
+        return CueTable(starts, ends, texts)
+
+
+class SourceContent:
+    """The json and .srt files as they sit in the repo, for development
+    or when no bundle has been built.
+    """
+    contentVersion = 'source'
+
+    def __init__(self, appDir=APP_DIR):
+        with open(os.path.join(appDir, 'conversations.json')) as f:
+            self.conversations = json.load(f)
+        with open(os.path.join(appDir, 'persons.json')) as f:
+            self.persons = json.load(f)
+        self.captionTables = loadCaptionTables(os.path.join(appDir, 'captions'))
+
+
+_loaded = None
+
+
+def loadContent(path=BUNDLE_PATH):
+    """Shared by model.py and control.py, opened once per process."""
+    global _loaded
+    if _loaded is None:
+        if os.path.exists(path):
+            _loaded = ContentBundle(path)
+            # Sizes and mtimes first; only hash when they don't match,
+            # e.g. after a checkout that touched the files
+            stats = sourceStats()
+            if (stats is not None and stats != _loaded.sourceStats and
+                    sourceDigest() != _loaded.sourceDigest):
+                # json or captions edited since the bundle was built
+                print(f" * {path} is stale -- the json/srt sources have changed since it"
+                      f" was built. Reading the source files; rerun build_bundle.py")
+                _loaded = SourceContent()
+        else:
+            print(f" * no content bundle at {path}, reading source files")
+            _loaded = SourceContent()
+        print(f" * content version: {_loaded.contentVersion}")
+    return _loaded
@@ -1,31 +1,57 @@
+import os
 import sys
+import time
 # import json
 from PyQt5 import QtWidgets as qtw
 from PyQt5 import QtCore as qtc
 from PyQt5.QtGui import QFont
 
 import vlc
-import board
-import busio
-from digitalio import Direction, Pull
-from RPi import GPIO
-from adafruit_mcp230xx.mcp23017 import MCP23017
 
+from hardware import openHardware
 from model import Model
+from jack_bank import JackArray, PortSnapshot
+from led_bank import LedArray
+from debounce import JackDebouncer
+from event_ring import EventRing
+from port_poller import PortPoller, DEFAULT_POLL_HZ
+from latency import trace
+from board_state import board
+from scheduler import scheduler
+from content_bundle import loadContent
+from i2c_worker import (I2CWorker, BusPool, PRIORITY_INTERRUPT, PRIORITY_INPUT,
+                        PRIORITY_CONFIG, PRIORITY_LED)
+
+BLINK_MS = 600
 
 class MainWindow(qtw.QMainWindow): 
     # Most of this module is analogous to svelte Panel
 
     # These signals are internal to control.py
     startPressed = qtc.pyqtSignal()
+    # Interrupt captures are waiting in interruptRing
     plugEventDetected = qtc.pyqtSignal()
+    # Port bits and read time from a bounce re-check on the i2c thread.
+    # object, not int: Qt passes an int as 32 bits and the port can be
+    # wider (start is bit 40 on topology-40.json)
+    pinsRead = qtc.pyqtSignal(object, float)
     plugInToHandle = qtc.pyqtSignal(int)
     unPlugToHandle = qtc.pyqtSignal(int)
     # wiggleDetected = qtc.pyqtSignal()
 
-    def __init__(self):
+    def __init__(self, hardware=None, inputMode=None):
         # self.pygame.init()
         super().__init__()
+        # Pi by default, or the simulated board (SB_HARDWARE=sim)
+        self.hardware = hardware if hardware is not None else openHardware()
+        # Which chips, pins and INT lines (SB_TOPOLOGY, see topology.py)
+        self.topology = self.hardware.topology
+        self.startBit = self.topology.buttonBit("start")
+        # Jack changes from the INT line(s), or from polling the port
+        # when INT misbehaves: SB_INPUT=interrupt|poll, SB_POLL_HZ
+        self.inputMode = inputMode or os.environ.get("SB_INPUT", "interrupt")
+        if self.inputMode not in ("interrupt", "poll"):
+            raise ValueError(f"unknown input mode: {self.inputMode}")
 
         # ------- pyqt window ----
         self.setWindowTitle("You Are the Operator")
@@ -46,17 +72,14 @@ class MainWindow(qtw.QMainWindow):
         self.model = Model()
 
         # --- timers --- 
-        self.bounceTimer=qtc.QTimer()
-        self.bounceTimer.timeout.connect(self.continueCheckPin)
-        self.bounceTimer.setSingleShot(True)
-        self.blinkTimer=qtc.QTimer()
-        self.blinkTimer.timeout.connect(self.blinker)
-
-        self.captionTimer=qtc.QTimer()
-        self.captionTimer.setSingleShot(True)
-        self.captionTimer.timeout.connect(self.display_next_caption)
+        # All on the shared scheduler, by name: "bounce" re-samples the
+        # jacks when the next pending jack could have settled, "blink"
+        # and "caption" reschedule themselves
+        self.debouncer = JackDebouncer(jackCount=self.topology.jackCount)
         self.captionIndex = 0
-        self.captions = 'empty'
+        self.captions = None
+        # Every hello/convo cue table, parsed once (or mapped from the bundle)
+        self.captionTables = loadContent().captionTables
         self.areCaptionsContinuing = True
 
         # Supress interrupt when plug is just wiggled (disabled)
@@ -69,15 +92,17 @@ class MainWindow(qtw.QMainWindow):
         self.startPressed.connect(self.startReset)
         # self.startPressed.connect(self.model.handleStart)
 
-        # Bounce timer less than 200 cause failure to detect 2nd line
-        # Tested with 100
-        self.plugEventDetected.connect(lambda: self.bounceTimer.start(300))
+        # Debounce is per jack (debounce.py), so a second plug during the
+        # first one's bounce is queued rather than lost
+        self.plugEventDetected.connect(self.drainInterrupts)
+        self.pinsRead.connect(self.checkPins)
         self.plugInToHandle.connect(self.model.handlePlugIn)
         self.unPlugToHandle.connect(self.model.handleUnPlug)
 
         # Eventst from model.py
         self.model.displayTextSignal.connect(self.displayText)
         self.model.setLEDSignal.connect(self.setLED)
+        self.model.setLEDMaskSignal.connect(self.setLEDMask)
         # self.model.pinInEvent.connect(self.setPinsIn)
         self.model.blinkerStart.connect(self.startBlinker)
         self.model.blinkerStop.connect(self.stopBlinker)
@@ -87,177 +112,204 @@ class MainWindow(qtw.QMainWindow):
         self.model.startResetSignal.connect(self.startReset)
    
 
-        # Initialize the I2C bus:
-        i2c = busio.I2C(board.SCL, board.SDA)
-        self.mcp = MCP23017(i2c) # default address-0x20
-        # self.mcpRing = MCP23017(i2c, address=0x22)
-        self.mcpLed = MCP23017(i2c, address=0x21)
-
-        # -- Make a list of pins for each bonnet, set input/output --
-        # Plug tip, which will trigger interrupts
-        self.pins = []
-        for pinIndex in range(0, 16):
-            self.pins.append(self.mcp.get_pin(pinIndex))
-        # Will be initiallized to pull.up in reset()
+        # All bus traffic runs on this thread, which owns busio.I2C,
+        # so a slow transfer can't hold up the GUI thread. With more
+        # than one bus it hands each bus's share to that bus's thread
+        self.i2cWorker = I2CWorker()
+        self.i2cWorker.start()
+        self.busPool = BusPool(self.topology.buses)
+
+        # Initialize the I2C buses: tip chip(s), 0x20 on the original
+        # board, and LED chip(s), 0x21
+        self.inputChips, self.ledChips = self.i2cWorker.call(
+            PRIORITY_CONFIG, self.hardware.openChips)
+
+        # Plug tip, which will trigger interrupts.
+        # Whole chip is configured as inputs with pull-up in reset()
+        # Port snapshots -- one I2C read per chip per event rather than
+        # one per pin, jacks and buttons as one global port
+        self.jackBank = JackArray(self.topology, self.inputChips, self.busPool)
+        # Filled by the interrupt callback, drained on the Qt thread
+        self.interruptRing = EventRing()
 
         # LEDs 
         # Tried to put these in the Model/logic module -- but seems all gpio
         # needs to be in this base/main module
-        self.pinsLed = []
-        for pinIndex in range(0, 12):
-            self.pinsLed.append(self.mcpLed.get_pin(pinIndex))
+        # LED changes go to a shadow latch, flushed once per event.
         # Set to output in reset()
-
-        # -- Set up Tip interrupt --
-        self.mcp.interrupt_enable = 0xFFFF  # Enable Interrupts in all pins
-        # self.mcp.interrupt_enable = 0xFFF  # Enable Interrupts first 12 pins
-        # self.mcp.interrupt_enable = 0b0000111111111111  # Enable Interrupts in pins 0-11 aka 0xfff
-
-        # If intcon is set to 0's we will get interrupts on both
-        #  button presses and button releases
-        self.mcp.interrupt_configuration = 0x0000  # interrupt on any change
-        self.mcp.io_control = 0x44  # Interrupt as open drain and mirrored
-        # put this in startup?
-
-        self.mcp.clear_ints()  # Interrupts need to be cleared initially
+        self.ledBank = LedArray(self.topology, self.ledChips, self.busPool)
+        self.ledFlushPending = False
+
+        # Polled input takes the same path as interrupt captures
+        self.poller = None
+        if (self.inputMode == "poll"):
+            self.poller = PortPoller(
+                self.i2cWorker, lambda: self.jackBank.read().bits, self.queueCapture,
+                float(os.environ.get("SB_POLL_HZ", DEFAULT_POLL_HZ)))
+
+        # Bus, input and scheduler state, printed with the latency table
+        # on SIGUSR1 and at exit rather than on every Start
+        trace.addReport(self.i2cWorker.report)
+        trace.addReport(self.interruptRing.report)
+        if (self.poller is not None):
+            trace.addReport(self.poller.report)
+        trace.addReport(lambda: f" * scheduler pending: {scheduler.pending()}")
+        trace.addReport(lambda: f" * board changes since reset: "
+                                f"{board.snapshot().diff(self.startBoard)}")
+
+        # -- Tip interrupt is set up in reset(), with the rest of the chip --
         self.reset()
 
-        # connect either interrupt pin to the Raspberry pi's pin 17.
-        # They were previously configured as mirrored.
-        GPIO.setmode(GPIO.BCM)
-        interrupt = 17
-        GPIO.setup(interrupt, GPIO.IN, GPIO.PUD_UP)  # Set up Pi's pin as input, pull up
-
-        # -- code for detection --
-        def checkPin(port):
-            """Callback function to be called when an Interrupt occurs.
-            The signal for pluginEventDetected calls a timer -- it can't send
-            a parameter, so the work-around is to set pin_flag as a global.
-            """
-            for pin_flag in self.mcp.int_flag:
-                # print("Interrupt connected to Pin: {}".format(port))
-                print(f"* Interrupt - pin number: {pin_flag} changed to: {self.pins[pin_flag].value}")
-
-                # Test for phone jack vs start and stop buttons
-                if (pin_flag < 12):
-                    # Don't restart this interrupt checking if we're still
-                    # in the pause part of bounce checking
-                    if (not self.just_checked):
-                        self.pinFlag = pin_flag
-
-                            # # Disabling wiggle check
-                            # # # If this pin is in, delay before checking
-                            # # # to protect against inadvertent wiggle
-                            # if (self.model.getIsPinIn(pin_flag) == True):
-                            #     # print(f" ** pin {pin_flag} is already in - so wiggle wait")
-                            #     # This will trigger a pause
-                            #     self.wiggleDetected.emit()
-                            # else: # pin is not in, new event
-                            #     # elif (not self.awaitingRestart):
-
-                            #     # do standard check
-                            #     self.just_checked = True
-                            #     # The following signal starts a timer that will continue
-                            #     # the check. This provides bounce protection
-                            #     # This signal is separate from the main python event loop
-                            #     # This emit will start bounc_timer with 300
-                            #     self.plugEventDetected.emit()
-                            
-                        self.plugEventDetected.emit()
-                        # Starts bounceTimer which call continuePinCheck
-
-                else:
-                    print(" * got to interupt 12 or greater \n")
-                    if (pin_flag == 13 and self.pins[13].value == False):
-                        # if (self.pins[13].value == False):
-                        self.startPressed.emit() # Calls startReset
-                        
-                    # self.pinsLed[0].value = True
-        # As of 2024-03-23 bounctime had been 100, changed to 150
-        GPIO.add_event_detect(interrupt, GPIO.BOTH, callback=checkPin, bouncetime=50)
+        if (self.poller is not None):
+            print(f" * polling input at {self.poller.rateHz:g} Hz, INT not watched")
+            self.poller.start()
+        else:
+            # -- code for detection --
+            def checkPin(port):
+                """Callback function to be called when an Interrupt occurs.
+                Runs on the RPi.GPIO thread, so it only stamps the time and
+                queues the INTF+INTCAP capture ahead of all other bus work.
+                drainInterrupts does the rest on the Qt thread.
+                """
+                self.i2cWorker.submit(PRIORITY_INTERRUPT, self.captureInterrupt,
+                                      time.monotonic(), port)
+            # Mirrored INT of each input chip, on the Pi pin(s) the topology
+            # gives (17 on the original board) or the simulated lines.
+            # port tells them apart
+            for interruptLine in self.hardware.interruptLines.values():
+                interruptLine.watch(checkPin)
 
     def reset(self):
-        self.mcp.clear_ints()
+        resetStartTime = time.perf_counter()
         self.label.setText("Press the Start button to begin!")
-        self.just_checked = False
-        self.pinFlag = 15
-        self.pinToBlink = 0
         self.awaitingRestart = False
         self.captionIndex = 0
 
-        # Set to input - later will get intrrupt as well
-        for pinIndex in range(0, 16):
-            self.pins[pinIndex].direction = Direction.INPUT
-            self.pins[pinIndex].pull = Pull.UP
-        # Set to output
-        for pinIndex in range(0, 12):
-           self.pinsLed[pinIndex].switch_to_output(value=False)
-
-        self.mcp.clear_ints()  # Interrupts need to be cleared initially
-
-        if self.bounceTimer.isActive():
-            self.bounceTimer.stop()
-        if self.blinkTimer.isActive():
-            self.blinkTimer.stop()            
-        # if self.wiggleTimer.isActive():
-            # self.wiggleTimer.stop()  
-        if self.captionTimer.isActive():
-            self.captionTimer.stop()  
+        # Whatever is in the jacks now counts as settled
+        portBits = self.i2cWorker.call(PRIORITY_CONFIG, self.configureChips)
+        self.debouncer.reset(portBits)
+        board.setPluggedMask(PortSnapshot(portBits, self.topology.jackMask).groundedJacks())
+        board.setUnsettled(0)
+        # configureChips turned every LED off
+        board.resetOutputs()
+        self.startBoard = board.snapshot()
+        print(f" * reset register config took: "
+              f"{(time.perf_counter() - resetStartTime) * 1000:.1f} ms")
+
+        for name in ("bounce", "blink", "caption"):
+            scheduler.cancel(name)
 
         # self.setLED(0, True)          
         # self.setLED(1, True)          
         # self.setLED(2, True)          
 
-    def continueCheckPin(self):
-        # Not able to send param through timer, so pinFlag has been set globaly
-        print(f" * In continue, pinFlag = {str(self.pinFlag)} " 
-              f"  * value: {str(self.pins[self.pinFlag].value)}")
+    def configureChips(self):
+        """Runs on the i2c thread. Returns the port bits after setup."""
+        # Tip chip: IODIR, GPPU, GPINTEN, INTCON as bulk writes, clear ints
+        self.jackBank.configureInputs()
+        # Set to output, all off -- IODIR and OLAT written once each
+        self.ledBank.configureOutputs()
+        bits = self.jackBank.read().bits
+        if (self.poller is not None):
+            self.poller.resetBits(bits)
+        return bits
+
+    def captureInterrupt(self, stamp, intPin=None):
+        """Runs on the i2c thread, ahead of any queued reads or LED writes.
+        Only the chips on the INT line that fired are read.
+        """
+        intFlag, intCap = self.jackBank.readInterruptCapture(intPin)
+        self.queueCapture(stamp, intFlag, intCap)
+
+    def queueCapture(self, stamp, intFlag, intCap):
+        # i2c thread: an interrupt capture, or a poll that saw changes
+        if (not self.interruptRing.push(stamp, intFlag, intCap)
+                and self.interruptRing.dropped == 1):
+            print(" * interrupt ring full, dropping captures")
+        self.plugEventDetected.emit() # Calls drainInterrupts
+
+    def drainInterrupts(self):
+        """Handle every interrupt captured since the last drain, in order.
+        """
+        for stamp, intFlag, intCap in self.interruptRing.drain():
+            snapshot = PortSnapshot(intCap, self.topology.jackMask)
+            pin_flag = 0
+            while intFlag >> pin_flag:
+                if (intFlag >> pin_flag) & 1:
+                    print(f"* Interrupt - pin number: {pin_flag} changed to: {snapshot.value(pin_flag)}")
+                    # Only jacks are traced -- Start and spare pins never finish
+                    if (self.topology.jackMask >> pin_flag) & 1:
+                        trace.begin(pin_flag, stamp)
+                pin_flag += 1
+
+            # Test for phone jack vs start and stop buttons
+            if (intFlag & self.topology.jackMask):
+                self.checkPins(intCap, stamp * 1000)
+            if (intFlag >> self.startBit) & 1:
+                if (snapshot.isGrounded(self.startBit)):
+                    self.startPressed.emit() # Calls startReset
+
+    def checkPins(self, portBits, sampledMs):
+        """Feed a port snapshot to the debouncer, hand every jack that has
+        settled to the model in order, then re-arm "bounce" for the
+        next jack still bouncing.
+        """
+        self.debouncer.sample(portBits, sampledMs)
+        # Before the edges go out, so the model sees jacks mid-pull
+        board.setUnsettled(self.debouncer.pendingMask)
+        nowMs = time.monotonic() * 1000
+        for pinIdx, isPlugIn, settledMs in self.debouncer.popEdges():
+            trace.mark(pinIdx, "settled", settledMs / 1000)
+            self.handlePinEdge(pinIdx, isPlugIn)
+
+        if (self.debouncer.hasPending()):
+            scheduler.callLater(self.debouncer.msToNextDeadline(nowMs),
+                                self.recheckPins, name="bounce")
+        else:
+            scheduler.cancel("bounce")
+
+    def recheckPins(self):
+        # Nothing new from the interrupt, so read the port ourselves
+        trace.markMask(self.debouncer.pendingMask, "bounceTimer")
+        self.i2cWorker.submit(PRIORITY_INPUT, self.readPinsForCheck)
+
+    def readPinsForCheck(self):
+        # Runs on the i2c thread, pinsRead calls checkPins back on this one
+        bits = self.jackBank.read().bits
+        self.pinsRead.emit(bits, time.monotonic() * 1000)
+
+    def handlePinEdge(self, pinIdx, isPlugIn):
+        print(f" * Settled, pin = {str(pinIdx)} " 
+              f"  * plug in: {str(isPlugIn)}")
+        # Tracked even while awaiting restart, for the remove-plugs check
+        board.setPlugged(pinIdx, isPlugIn)
 
         if (self.awaitingRestart):
             # do nothing - awaiting press of start button
             print(' * awaiting restart')
+            trace.finish(pinIdx)
         else:
             # Plug-in
-            if (self.pins[self.pinFlag].value == False): 
+            if (isPlugIn): 
                 # grounded by tip, aka connected
-                """
-                False/grouded, then this event is a plug-in
-                """
                 # Send pin index to model.py as an int 
-                # Model uses signals for LED, text and pinsIn to set here
-                self.plugInToHandle.emit(self.pinFlag)
+                # Model uses signals for LED and text, board for inUse
+                self.plugInToHandle.emit(pinIdx)
             # Unplug
-            else: # pin flag True, still, or again, high
+            else: # pin high again
                 # aka not connected
-                # print(f"  ** got to pin disconnected in continueCheckPin")
-
                 # was this a legit unplug?
-                if (self.model.getIsPinIn(self.pinFlag)):
+                if (board.isInUse(pinIdx)):
                     # if this pin was in
-                    # print(f"Pin {self.pinFlag} has been disconnected \n")
-                    print(f" * pin {self.pinFlag} was in - handleUnPlug")
+                    print(f" * pin {pinIdx} was in - handleUnPlug")
 
                     # On unplug we can't tell which line electonicaly 
-                    # (diff in shaft is gone), so rely on pinsIn info
-                    self.unPlugToHandle.emit(self.pinFlag) # , self.whichLinePlugging
-                    # Model handleUnPlug will set pinsIn false for this on
+                    # (diff in shaft is gone), so rely on inUse info
+                    self.unPlugToHandle.emit(pinIdx) # , self.whichLinePlugging
+                    # Model handleUnPlug will clear inUse for this one
                 else:
                     print(" ** got to pin true (changed to high), but not pin in")
-
-        # Delay setting just_check to false in case the plug is wiggled
-        # qtc.QTimer.singleShot(300, self.delayedFinishCheck)
-        # qtc.QTimer.singleShot(70, self.delayedFinishCheck)
-        qtc.QTimer.singleShot(150, self.delayedFinishCheck)
-
-
-    def delayedFinishCheck(self):
-        # This just delay resetting just_checked
-        print(" * delayed finished check \n")
-        self.just_checked = False
-
-        # Experimental
-        self.mcp.clear_ints()  # This seems to keep things fresh
-
+                    trace.finish(pinIdx)
 
     # def checkWiggle(self):
     #     print(" * got to checkWiggle")
@@ -277,34 +329,54 @@ class MainWindow(qtw.QMainWindow):
         self.label.setText(msg)        
 
     def setLED(self, flagIdx, onOrOff):
-        self.pinsLed[flagIdx].value = onOrOff     
+        trace.mark(flagIdx, "setLED")
+        board.setLit(flagIdx, onOrOff)
+        self.scheduleLEDFlush()
+
+    def setLEDMask(self, ledMask, onOrOff):
+        board.setLitMask(ledMask, onOrOff)
+        self.scheduleLEDFlush()
+
+    def scheduleLEDFlush(self):
+        # Every LED change made while handling this event goes out
+        # in a single write once control returns to the event loop
+        if (not self.ledFlushPending):
+            self.ledFlushPending = True
+            scheduler.callSoon(self.flushLEDs)
+
+    def flushLEDs(self):
+        self.ledFlushPending = False
+        self.ledBank.load(board.lit)
+        ledBits = self.ledBank.takeDirty()
+        if (ledBits is not None):
+            # A reset queued ahead of this write (PRIORITY_CONFIG) bumps
+            # the generation, and writeLatch then drops it
+            self.i2cWorker.submit(PRIORITY_LED, self.ledBank.writeLatch, ledBits,
+                                  self.ledBank.generation)
 
     def blinker(self):
-        self.pinsLed[self.pinToBlink].value = not self.pinsLed[self.pinToBlink].value
-        # print("blinking value: " + str(self.pinsLed[self.pinToBlink].value))
+        board.blink()
+        self.flushLEDs()
+        scheduler.callLater(BLINK_MS, self.blinker, name="blink")
         
     def startBlinker(self, personIdx):
-        self.pinToBlink = personIdx
-        self.blinkTimer.start(600)
+        board.setBlinking(personIdx, True)
+        scheduler.callLater(BLINK_MS, self.blinker, name="blink")
 
     def stopBlinker(self):
-        if self.blinkTimer.isActive():
-            self.blinkTimer.stop()
+        board.stopBlinking()
+        scheduler.cancel("blink")
 
     def setLEDsOff(self):
-        for pinIndex in range(0, 12):
-            self.setLED(pinIndex, False)
+        self.setLEDMask(self.topology.ledMask, False)
 
     def getAnyPinsIn(self):
-        anyPinsIn = False
-
-        for pinIndex in range(0, 12):
-            if self.pins[pinIndex].value == False:
-                anyPinsIn = True
-        return anyPinsIn
+        # Debounced plug state -- no bus read
+        return board.anyPlugged()
 
     def startReset(self):
         print(" * resetting, starting")
+        startResetTime = time.perf_counter()
         self.awaitingRestart = True
         self.stopCaptions()
         self.setLEDsOff()
@@ -318,50 +390,54 @@ class MainWindow(qtw.QMainWindow):
         else:
             self.reset()
             self.model.handleStart()
+            # Welcome audio has been handed to VLC at this point
+            print(f" * start to welcome play took: "
+                  f"{(time.perf_counter() - startResetTime) * 1000:.1f} ms")
 
     def stopCaptions(self):
         self.areCaptionsContinuing = False
-        self.captionTimer.stop()
-
-    def time_str_to_ms(self, time_str):
-        hours, minutes, seconds_ms = time_str.split(':')
-        seconds, milliseconds = seconds_ms.split(',')
-        return int(hours) * 3600000 + int(minutes) * 60000 + int(seconds) * 1000 + int(milliseconds)
+        scheduler.cancel("caption")
 
-    # Mostly from ChatGPT
     def displayCaptions(self, fileType, file_name):
-        with open('captions/' + fileType + '/' + file_name + '.srt', 'r') as f:
-            self.captions = f.read().split('\n\n')
+        # Cue tables were parsed at startup -- no file read here
+        self.captions = self.captionTables[fileType].get(file_name)
+        if (self.captions is None):
+            print(f" * no captions for {fileType}/{file_name}")
+            return
         self.areCaptionsContinuing = True
-        self.captionIndex = 0
+        self.captionIndex = -1
 
         self.display_next_caption()
 
     def display_next_caption(self):
-        # print('got to display_next_caption')
-        # nonlocal self
-        if self.captionIndex < len(self.captions):
-            caption = self.captions[self.captionIndex]
-            # print(f'full entry: {caption}')
-            if '-->' in caption:
-                number, time, text = caption.split('\n', 2)
-                # print(f'#: {number} time: {time}, text: {text}')
-                # Stop if unplugged
-                if (self.areCaptionsContinuing):
-                    self.displayText(text)
-                # Proccess time
-                times = time.split(' --> ')
-                # print(f'times[0]: {times[0]}')
-                start_time_ms = self.time_str_to_ms(times[0])
-                end_time_ms = self.time_str_to_ms(times[1])
-                duration_ms = end_time_ms - start_time_ms
-                if (self.areCaptionsContinuing):
-                    self.captionTimer.start(duration_ms)
-            self.captionIndex += 1
-
-app = qtw.QApplication([])
-
-win = MainWindow()
-win.show()
-
-sys.exit(app.exec_())
\ No newline at end of file
+        """Show the cue for where the voice track actually is, then sleep
+        until the next cue's start time on that same clock. Restarts
+        (reCall, playFullConvo) land on the right cue by binary search.
+        """
+        # Stop if unplugged
+        if (not self.areCaptionsContinuing or self.captions is None):
+            return
+        # -1 until VLC has started the track -- treat as the beginning
+        nowMs = max(0, self.model.getVoiceTime())
+        cueIdx = self.captions.cueIndexAt(nowMs)
+        if (cueIdx >= 0 and cueIdx != self.captionIndex):
+            self.captionIndex = cueIdx
+            self.displayText(self.captions.texts[cueIdx])
+        nextIdx = cueIdx + 1
+        if nextIdx < len(self.captions):
+            # If the clock hasn't moved as expected (VLC still starting)
+            # this just wakes again and re-reads it
+            scheduler.callLater(max(1, self.captions.starts[nextIdx] - nowMs),
+                                self.display_next_caption, name="caption")
+
+if __name__ == '__main__':
+    app = qtw.QApplication([])
+
+    win = MainWindow()
+    win.show()
+    app.aboutToQuit.connect(win.model.releaseMedia)
+    app.aboutToQuit.connect(win.busPool.shutdown)
+    if win.poller is not None:
+        app.aboutToQuit.connect(win.poller.stop)
+
+    sys.exit(app.exec_())
\ No newline at end of file
@@ -1,28 +1,28 @@
 import sys
+import time
 # import json
 from PyQt5 import QtWidgets as qtw
 from PyQt5 import QtCore as qtc
 from PyQt5.QtGui import QFont
 
 import vlc
-import board
-import busio
-from digitalio import Direction, Pull
-from RPi import GPIO
-from adafruit_mcp230xx.mcp23017 import MCP23017
 
-from model_single import Model
+from model import Model
+from hardware import openHardware
+from jack_bank import JackBank, START_BUTTON
+from led_bank import LedBank
+from board_state import board as boardState, bitIndexes
 
 class MainWindow(qtw.QMainWindow): 
     # Most of this module is analogous to svelte Panel
 
     startPressed = qtc.pyqtSignal()
     plugEventDetected = qtc.pyqtSignal()
-    plugInToHandle = qtc.pyqtSignal(dict)
-    unPlugToHandle = qtc.pyqtSignal(int, int)
+    plugInToHandle = qtc.pyqtSignal(int, int)
+    unPlugToHandle = qtc.pyqtSignal(int)
     wiggleDetected = qtc.pyqtSignal()
 
-    def __init__(self):
+    def __init__(self, hardware=None):
         # self.pygame.init()
         super().__init__()
 
@@ -44,7 +44,8 @@ class MainWindow(qtw.QMainWindow):
 
         self.setCentralWidget(self.label)
 
-        self.model = Model()
+        # Two pairs of cords
+        self.model = Model(lineCount=2)
 
         # ------ phone call logic------
         self.whichLinePlugging = -1
@@ -67,87 +68,56 @@ class MainWindow(qtw.QMainWindow):
 
         # Bounce timer less than 200 cause failure to detect 2nd line
         # Tested with 100
-        self.plugEventDetected.connect(lambda: self.bounceTimer.start(300))
+        self.plugEventDetected.connect(self.startBounceWait)
         self.plugInToHandle.connect(self.model.handlePlugIn)
         self.unPlugToHandle.connect(self.model.handleUnPlug)
 
         # Eventst from model.py
-        self.model.displayText.connect(self.setScreenLabel)
-        self.model.ledEvent.connect(self.setLED)
+        self.model.displayTextSignal.connect(self.setScreenLabel)
+        self.model.setLEDSignal.connect(self.setLED)
+        self.model.setLEDMaskSignal.connect(self.setLEDMask)
         # self.model.pinInEvent.connect(self.setPinsIn)
         self.model.blinkerStart.connect(self.startBlinker)
         self.model.blinkerStop.connect(self.stopBlinker)
         # self.model.checkPinsInEvent.connect(self.checkPinsIn)
+        self.model.startResetSignal.connect(self.startReset)
 
 
 
-        # Initialize the I2C bus:
-        i2c = busio.I2C(board.SCL, board.SDA)
-        self.mcp = MCP23017(i2c) # default address-0x20
-        self.mcpRing = MCP23017(i2c, address=0x22)
-        self.mcpLed = MCP23017(i2c, address=0x21)
-
-        # -- Make a list of pins for each bonnet, set input/output --
-        # Plug tip, which will trigger interrupts
-        self.pins = []
-        for pinIndex in range(0, 16):
-            self.pins.append(self.mcp.get_pin(pinIndex))
-        # # Set to input - later will get intrrupt as well
-        # for pinIndex in range(0, 16):
-        #     self.pins[pinIndex].direction = Direction.INPUT
-        #     self.pins[pinIndex].pull = Pull.UP
-
-        # Stereo "ring" which will detect 1st vs 2nd line
-        self.pinsRing = []
-        for pinIndex in range(0, 12):
-            self.pinsRing.append(self.mcpRing.get_pin(pinIndex))
-        # # Set to input
-        # for pinIndex in range(0, 12):
-        #     self.pinsRing[pinIndex].direction = Direction.INPUT
-        #     self.pinsRing[pinIndex].pull = Pull.UP
+        # Pi (busio + RPi.GPIO) or the simulated board, SB_HARDWARE=pi|sim
+        self.hardware = hardware if hardware is not None else openHardware()
+        tipChips, ledChips = self.hardware.openChips()
+        self.mcp = tipChips[0] # default address-0x20
+        self.mcpRing = self.hardware.openRingChip() # 0x22
+        self.mcpLed = ledChips[0] # 0x21
+
+        # Plug tip, which will trigger interrupts, and stereo "ring"
+        # which will detect 1st vs 2nd line. Read together as one burst
+        # per chip, so plugged and line come from the same moment
+        self.jackBank = JackBank(self.mcp, self.mcpRing)
 
         # LEDs 
         # Tried to put these in the Model/logic module -- but seems all gpio
-        # needs to be in this base/main module
-        self.pinsLed = []
-        for pinIndex in range(0, 12):
-            self.pinsLed.append(self.mcpLed.get_pin(pinIndex))
-        # In Reset
-        # # Set to output
-        # for pinIndex in range(0, 12):
-        #    self.pinsLed[pinIndex].switch_to_output(value=False)
-
-        # -- Set up Tip interrupt --
-        self.mcp.interrupt_enable = 0xFFFF  # Enable Interrupts in all pins
-        # self.mcp.interrupt_enable = 0xFFF  # Enable Interrupts first 12 pins
-        # self.mcp.interrupt_enable = 0b0000111111111111  # Enable Interrupts in pins 0-11 aka 0xfff
-
-        # If intcon is set to 0's we will get interrupts on both
-        #  button presses and button releases
-        self.mcp.interrupt_configuration = 0x0000  # interrupt on any change
-        self.mcp.io_control = 0x44  # Interrupt as open drain and mirrored
-        # put this in startup?
-
-        self.mcp.clear_ints()  # Interrupts need to be cleared initially
-
+        # needs to be in this base/main module. Shadow latch, set to
+        # output in reset
+        self.ledBank = LedBank(self.mcpLed)
 
+        # -- Tip interrupt and ring inputs are set up in reset() --
         self.reset()
 
-        # connect either interrupt pin to the Raspberry pi's pin 17.
-        # They were previously configured as mirrored.
-        GPIO.setmode(GPIO.BCM)
-        interrupt = 17
-        GPIO.setup(interrupt, GPIO.IN, GPIO.PUD_UP)  # Set up Pi's pin as input, pull up
-
         # -- code for detection --
         def checkPin(port):
             """Callback function to be called when an Interrupt occurs.
             The signal for pluginEventDetected calls a timer -- it can't send
             a parameter, so the work-around is to set pin_flag as a global.
             """
-            for pin_flag in self.mcp.int_flag:
+            # INTF, INTCAP and the ring port, read once for all pins
+            intFlag, scan = self.jackBank.captureScan(time.monotonic())
+            for pin_flag in range(0, 16):
+                if not (intFlag >> pin_flag) & 1:
+                    continue
                 # print("Interrupt connected to Pin: {}".format(port))
-                print(f"Interrupt - pin number: {pin_flag} changed to: {self.pins[pin_flag].value}")
+                print(f"Interrupt - pin number: {pin_flag} changed to: {scan.tip.value(pin_flag)}")
 
                 # Test for phone jack vs start and stop buttons
                 if (pin_flag < 12):
@@ -189,12 +159,15 @@ class MainWindow(qtw.QMainWindow):
 
                 else:
                     print("got to interupt 12 or greater")
-                    if (pin_flag == 13 and self.pins[13].value == False):
+                    if (pin_flag == START_BUTTON and scan.tip.isGrounded(START_BUTTON)):
                         # if (self.pins[13].value == False):
                         self.startPressed.emit()
                     # self.pinsLed[0].value = True
 
-        GPIO.add_event_detect(interrupt, GPIO.BOTH, callback=checkPin, bouncetime=100)
+        # connect either interrupt pin to the Raspberry pi's pin 17.
+        # They were previously configured as mirrored.
+        for interruptLine in self.hardware.interruptLines.values():
+            interruptLine.watch(checkPin, bouncetime=100)
 
     def reset(self):
         self.label.setText("Press the Start button to begin!")
@@ -203,21 +176,15 @@ class MainWindow(qtw.QMainWindow):
         self.pinToBlink = 0
         self.awaitingRestart = False
 
-        # Set to input - later will get intrrupt as well
-        for pinIndex in range(0, 16):
-            self.pins[pinIndex].direction = Direction.INPUT
-            self.pins[pinIndex].pull = Pull.UP
-
-        # Set to input
-        for pinIndex in range(0, 12):
-            self.pinsRing[pinIndex].direction = Direction.INPUT
-            self.pinsRing[pinIndex].pull = Pull.UP
+        # Tip: inputs with pull-up and interrupt on any change, ring:
+        # inputs with pull-up -- whole-chip writes, then clear ints
+        self.jackBank.configureInputs()
+        # Whatever is in the jacks now counts as settled
+        boardState.setPluggedMask(self.jackBank.scan().pluggedMask())
+        boardState.setUnsettled(0)
 
-        # Set to output
-        for pinIndex in range(0, 12):
-           self.pinsLed[pinIndex].switch_to_output(value=False)
-
-        self.mcp.clear_ints()  # Interrupts need to be cleared initially
+        # Set to output, all off
+        self.ledBank.configureOutputs()
 
         if self.bounceTimer.isActive():
             self.bounceTimer.stop()
@@ -226,56 +193,73 @@ class MainWindow(qtw.QMainWindow):
         if self.wiggleTimer.isActive():
             self.wiggleTimer.stop()            
 
+    def startBounceWait(self):
+        # The jack is mid-change until continueCheckPin reads it again --
+        # the model's dual unplug check waits on it
+        boardState.setUnsettled(1 << self.pinFlag)
+        self.bounceTimer.start(300)
+
     def continueCheckPin(self):
         # Not able to send param through timer, so pinFlag has been set globaly
         # print("In continue, pinFlag = " + str(self.pinFlag) + " val: " +
         #       str(self.pins[self.pinFlag].value))
 
-        if (self.pins[self.pinFlag].value == False): # grounded by cable
+        # Tip and ring as they are now, after the bounce wait
+        scan = self.jackBank.scan()
+        # Interrupts for other jacks are ignored during the wait, so also
+        # hand on any jack that changed meanwhile -- the other end of a
+        # call pulled out together with this one
+        changed = (scan.pluggedMask() ^ boardState.plugged) & ~(1 << self.pinFlag)
+        self.handlePinEdge(self.pinFlag, scan)
+        for pinIdx in bitIndexes(changed):
+            self.handlePinEdge(pinIdx, scan)
+        boardState.setUnsettled(0)
+
+        # print("finished check \n")
+
+        # self.mcp.clear_ints()
+        # self.just_checked = False
+        # Delay setting just_check to false in case the plug is wiggled
+        # qtc.QTimer.singleShot(300, self.delayedFinishCheck)
+        qtc.QTimer.singleShot(70, self.delayedFinishCheck)
+
+    def handlePinEdge(self, pinIdx, scan):
+        isPlugIn = scan.isPlugged(pinIdx)
+        # One jack at a time, before the model hears of it, so an unplug
+        # still finds the other end of its call plugged
+        boardState.setPlugged(pinIdx, isPlugIn)
+        if (isPlugIn): # grounded by cable
             """False/grouded, then this event is a plug-in
             """
-            # Determine which line
-            self.whichLinePlugging = 0
-            # print("Stereo (Ring) pin {} aledgedly now: {}".format(self.pinFlag, self.pinsRing[self.pinFlag].value))
-
-            # # Disabling second line
-            # if (self.pinsRing[self.pinFlag].value == True):
-            #     self.whichLinePlugging = 1
-            # print(f"Pin {self.pinFlag} connected on line {self.whichLinePlugging}")
+            # Determine which line -- ring still high means line 1
+            self.whichLinePlugging = scan.lineOf(pinIdx)
+            print(f"Pin {pinIdx} connected on line {self.whichLinePlugging}")
 
 
-            # Send plugin info to model.py as a dict 
+            # Send plugin info to model.py: person and line
             # Model uses signals for LED, text and pinsIn to set here
-            self.plugInToHandle.emit({"personIdx": self.pinFlag, "lineIdx": self.whichLinePlugging})
+            self.plugInToHandle.emit(pinIdx, self.whichLinePlugging)
         else: # pin flag True, still, or again, high
             # was this a legit unplug?
             # if (self.pinsIn[self.pinFlag]): # was plugged in
 
             # if (self.model.getPinsIn(self.pinFlag)):
-            if (self.model.getPinInLine(self.pinFlag) >= 0):
+            if (boardState.isInUse(pinIdx)):
                 # print(f"Pin {self.pinFlag} has been disconnected \n")
 
                 # Need to indirectly determine which line is being unpluged.
                 # Cant't test directly bcz stereo ring is no longer in place
                 # pinsIn : instead of True/False make it hold line index
 
-                print(f" ++ pin {self.pinFlag} was in on line {self.model.getPinInLine(self.pinFlag)}")
+                print(f" ++ pin {pinIdx} was in on line {boardState.lineOf(pinIdx)}")
 
                 # On unplug we can't tell which line electonicaly 
-                # (diff in shaft is gone), so rely on pinsIn info
-                self.unPlugToHandle.emit(self.pinFlag, self.whichLinePlugging)
+                # (diff in shaft is gone), so the model looks it up
+                self.unPlugToHandle.emit(pinIdx)
                 # Model handleUnPlug will set pinsIn false for this on
 
             else:
                 print("got to pin true (changed to high), but not pin in")
-        
-        # print("finished check \n")
-
-        # self.mcp.clear_ints()
-        # self.just_checked = False
-        # Delay setting just_check to false in case the plug is wiggled
-        # qtc.QTimer.singleShot(300, self.delayedFinishCheck)
-        qtc.QTimer.singleShot(70, self.delayedFinishCheck)
 
 
     def delayedFinishCheck(self):
@@ -291,7 +275,7 @@ class MainWindow(qtw.QMainWindow):
         # self.wiggleTimer.stop() -- now singleShot
         # Check whether the pin still grounded
         # if no longer grounded, proceed with event detection
-        if (not self.pins[self.pinFlag].value == False):
+        if (not self.jackBank.read().isGrounded(self.pinFlag)):
             # The pin is no longer in
             self.just_checked = True
             self.plugEventDetected.emit()
@@ -302,11 +286,17 @@ class MainWindow(qtw.QMainWindow):
         self.label.setText(msg)        
 
     def setLED(self, flagIdx, onOrOff):
-        self.pinsLed[flagIdx].value = onOrOff     
+        self.ledBank.set(flagIdx, onOrOff)
+        self.ledBank.flush()
+
+    def setLEDMask(self, ledMask, onOrOff):
+        self.ledBank.setMask(ledMask, onOrOff)
+        self.ledBank.flush()
 
     def blinker(self):
         # print("blinking")
-        self.pinsLed[self.pinToBlink].value = not self.pinsLed[self.pinToBlink].value
+        self.ledBank.toggle(self.pinToBlink)
+        self.ledBank.flush()
         
     def startBlinker(self, personIdx):
         self.pinToBlink = personIdx
@@ -316,12 +306,7 @@ class MainWindow(qtw.QMainWindow):
         if self.blinkTimer.isActive():
             self.blinkTimer.stop()
     def getAnyPinsIn(self):
-        anyPinsIn = False
-
-        for pinIndex in range(0, 12):
-            if self.pins[pinIndex].value == False:
-                anyPinsIn = True
-        return anyPinsIn
+        return self.jackBank.read().anyJacksIn()
 
     def startReset(self):
         print("reseting, starting")
@@ -337,9 +322,10 @@ class MainWindow(qtw.QMainWindow):
             self.reset()
             self.model.handleStart()
 
-app = qtw.QApplication([])
+if __name__ == '__main__':
+    app = qtw.QApplication([])
 
-win = MainWindow()
-win.show()
+    win = MainWindow()
+    win.show()
 
-sys.exit(app.exec_())
\ No newline at end of file
+    sys.exit(app.exec_())
\ No newline at end of file
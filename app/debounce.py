@@ -0,0 +1,93 @@
+"""Per-jack debounce state machine.
+
+Each jack keeps its own confirmed level and its own candidate level with
+the time that candidate was first seen. A candidate becomes a confirmed
+edge once it has held for that direction's stable time; a bounce back to
+the confirmed level just drops the candidate. Confirmed edges for every
+jack are queued in the order they settle, so two plugs arriving close
+together are both delivered instead of the second overwriting the first.
+"""
+from collections import deque
+
+from jack_bank import JACK_COUNT
+
+# How long a level must hold before it counts, in ms.
+# Plug-in is the tip grounding the pin; unplug is the pin going high again
+PLUG_STABLE_MS = 60
+UNPLUG_STABLE_MS = 90
+
+
+class JackDebouncer:
+    def __init__(self, plugStableMs=PLUG_STABLE_MS, unplugStableMs=UNPLUG_STABLE_MS,
+                 jackCount=JACK_COUNT):
+        self.plugStableMs = plugStableMs
+        self.unplugStableMs = unplugStableMs
+        # Jacks are the low bits of the port (see topology.py)
+        self.jackMask = (1 << jackCount) - 1
+        # Confirmed levels as port bits -- 1 is high (no plug)
+        self.stableBits = self.jackMask
+        # Jacks with a candidate level that hasn't settled yet
+        self.pendingMask = 0
+        self.candidateSince = [0.0] * jackCount
+        # Confirmed edges: (pinIdx, isPlugIn, settledAtMs)
+        self.edges = deque()
+
+    def reset(self, portBits):
+        """Take the current port as settled, e.g. after a board reset."""
+        self.stableBits = portBits & self.jackMask
+        self.pendingMask = 0
+        self.edges.clear()
+
+    def sample(self, portBits, nowMs):
+        """Feed one port snapshot. Returns True if any edge was confirmed.
+        Only jacks that differ from their settled level, or that already
+        have a candidate, are looked at.
+        """
+        portBits &= self.jackMask
+        changed = portBits ^ self.stableBits
+        # Jacks that bounced back to their settled level drop the candidate
+        self.pendingMask &= changed
+        confirmedAny = False
+        toCheck = changed
+        while toCheck:
+            lowBit = toCheck & -toCheck
+            pinIdx = lowBit.bit_length() - 1
+            toCheck ^= lowBit
+            if not self.pendingMask & lowBit:
+                # New candidate level for this jack
+                self.pendingMask |= lowBit
+                self.candidateSince[pinIdx] = nowMs
+                continue
+            isPlugIn = not portBits & lowBit
+            stableMs = self.plugStableMs if isPlugIn else self.unplugStableMs
+            if nowMs - self.candidateSince[pinIdx] >= stableMs:
+                self.stableBits ^= lowBit
+                self.pendingMask &= ~lowBit
+                self.edges.append((pinIdx, isPlugIn, nowMs))
+                confirmedAny = True
+        return confirmedAny
+
+    def hasPending(self):
+        return self.pendingMask != 0
+
+    def msToNextDeadline(self, nowMs):
+        """Time until the earliest pending jack could settle, or -1."""
+        if not self.pendingMask:
+            return -1
+        soonest = None
+        toCheck = self.pendingMask
+        while toCheck:
+            lowBit = toCheck & -toCheck
+            pinIdx = lowBit.bit_length() - 1
+            toCheck ^= lowBit
+            # Candidate level is the opposite of the settled one
+            isPlugIn = bool(self.stableBits & lowBit)
+            stableMs = self.plugStableMs if isPlugIn else self.unplugStableMs
+            deadline = self.candidateSince[pinIdx] + stableMs
+            if soonest is None or deadline < soonest:
+                soonest = deadline
+        return max(0, int(soonest - nowMs + 0.999))
+
+    def popEdges(self):
+        while self.edges:
+            yield self.edges.popleft()
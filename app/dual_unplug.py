@@ -0,0 +1,101 @@
+"""Tells a visitor pulling both plugs of a call apart from pulling one.
+
+When one end of an engaged call is unplugged the model asks the detector
+to wait for the other end. The wait is over as soon as
+  - the other jack's unplug arrives (dual), or
+  - the window runs out with the other jack still settled in (single).
+The window is learned: every gap seen between the two unplugs of a dual,
+and every "single" whose other plug came out shortly after anyway, goes
+into a short history, and the window is a high percentile of those gaps
+plus a margin, kept between MIN_WINDOW_MS and MAX_WINDOW_MS.
+
+Each line can have an unplug pending at once; they are kept by the jack
+still expected to come out, so an unplug is matched without a search.
+"""
+from collections import deque
+
+# Used until there are enough observed gaps
+DEFAULT_WINDOW_MS = 150
+MIN_WINDOW_MS = 60
+MAX_WINDOW_MS = 600
+MARGIN_MS = 30
+MIN_SAMPLES = 3
+HISTORY = 32
+
+
+class PendingUnplug:
+    __slots__ = ("lineIdx", "firstIdx", "otherIdx", "stopTime", "startMs", "extended")
+
+    def __init__(self, lineIdx, firstIdx, otherIdx, stopTime, startMs):
+        self.lineIdx = lineIdx
+        self.firstIdx = firstIdx
+        self.otherIdx = otherIdx
+        self.stopTime = stopTime
+        self.startMs = startMs
+        self.extended = False
+
+
+class DualUnplugDetector:
+    def __init__(self, initialWindowMs=DEFAULT_WINDOW_MS, percentile=90):
+        self.initialWindowMs = initialWindowMs
+        self.percentile = percentile
+        self.gaps = deque(maxlen=HISTORY)
+        # other jack -> PendingUnplug
+        self.pending = {}
+        # other jack -> ms, for unplugs resolved as single
+        self.lastSingle = {}
+        self.duals = 0
+        self.singles = 0
+        self.missed = 0
+
+    @property
+    def windowMs(self):
+        if len(self.gaps) < MIN_SAMPLES:
+            return self.initialWindowMs
+        ordered = sorted(self.gaps)
+        gap = ordered[min(len(ordered) - 1, len(ordered) * self.percentile // 100)]
+        return int(min(MAX_WINDOW_MS, max(MIN_WINDOW_MS, gap + MARGIN_MS)))
+
+    def begin(self, lineIdx, firstIdx, otherIdx, stopTime, nowMs):
+        self.pending[otherIdx] = PendingUnplug(lineIdx, firstIdx, otherIdx, stopTime, nowMs)
+        self.lastSingle.pop(otherIdx, None)
+
+    def isPendingFor(self, jackIdx):
+        return jackIdx in self.pending
+
+    def get(self, otherIdx):
+        return self.pending.get(otherIdx)
+
+    def resolveDual(self, jackIdx, nowMs):
+        """The other end came out. Returns the pending first unplug."""
+        pending = self.pending.pop(jackIdx)
+        self.gaps.append(nowMs - pending.startMs)
+        self.duals += 1
+        return pending
+
+    def resolveSingle(self, otherIdx, nowMs):
+        """The window ran out. Returns the pending first unplug."""
+        pending = self.pending.pop(otherIdx)
+        self.lastSingle[otherIdx] = pending.startMs
+        self.singles += 1
+        return pending
+
+    def noteUnplug(self, jackIdx, nowMs):
+        """Any unplug. If it is the other end of a call just resolved as
+        single, the visitor was slower than the window -- learn from it.
+        """
+        startMs = self.lastSingle.pop(jackIdx, None)
+        if startMs is None:
+            return
+        gap = nowMs - startMs
+        if gap <= MAX_WINDOW_MS:
+            self.gaps.append(gap)
+            self.missed += 1
+
+    def cancel(self):
+        self.pending.clear()
+        self.lastSingle.clear()
+
+    def report(self):
+        return (f"dual unplug: window {self.windowMs} ms, {self.duals} dual, "
+                f"{self.singles} single, {self.missed} slower than the window")
@@ -0,0 +1,50 @@
+"""Preallocated single-producer/single-consumer ring for interrupt captures.
+
+The i2c worker thread is the only writer -- it pushes each INTF+INTCAP
+capture, or a poll that saw changes -- and the Qt thread the only reader.
+Slots are plain preallocated lists, the writer fills a slot before
+advancing head and the reader copies a slot out before advancing tail, so
+no lock is needed and a push doesn't allocate. Getting the capture onto
+the worker does: the RPi.GPIO callback submits a Future and queue entry
+per edge.
+
+A push onto a full ring is dropped and counted in dropped, see report().
+"""
+
+
+class EventRing:
+    def __init__(self, size=64):
+        self.size = size
+        self.stamps = [0.0] * size
+        self.intFlags = [0] * size
+        self.intCaps = [0] * size
+        # head: next slot to write (producer), tail: next to read (consumer)
+        self.head = 0
+        self.tail = 0
+        self.dropped = 0
+
+    def push(self, stamp, intFlag, intCap):
+        """Producer side. Returns False (and counts it) when full."""
+        nextHead = (self.head + 1) % self.size
+        if nextHead == self.tail:
+            self.dropped += 1
+            return False
+        self.stamps[self.head] = stamp
+        self.intFlags[self.head] = intFlag
+        self.intCaps[self.head] = intCap
+        self.head = nextHead
+        return True
+
+    def report(self):
+        return f" * interrupt ring: {self.dropped} dropped (size {self.size})"
+
+    def isEmpty(self):
+        return self.head == self.tail
+
+    def drain(self):
+        """Consumer side. Yields (stamp, intFlag, intCap) oldest first."""
+        while self.tail != self.head:
+            idx = self.tail
+            record = (self.stamps[idx], self.intFlags[idx], self.intCaps[idx])
+            self.tail = (idx + 1) % self.size
+            yield record
@@ -0,0 +1,175 @@
+"""Hardware backends for the jack bank, the LED bank and the interrupt lines.
+
+control.py asks openHardware() for a backend and only talks to its
+topology, openChips() and interruptLines, so the same MainWindow runs on
+the Pi (busio + RPi.GPIO + adafruit MCP23017) or against sim_mcp23017 on
+any Linux box. Pick with SB_HARDWARE=pi|sim (default pi); the sim bus
+latency comes from SB_SIM_LATENCY_MS and SB_SIM_BYTE_US. Which chips
+there are, and on which buses and INT lines, is the topology's
+(SB_TOPOLOGY, see topology.py).
+"""
+import os
+import threading
+
+from sim_mcp23017 import SimMCP23017, IODIRA, DEFAULT_LATENCY_MS, DEFAULT_BYTE_US
+from topology import DEFAULT_BUS, DEFAULT_INT_PIN, gather, loadTopology
+
+# Ring contacts, on two-line boards only
+RING_ADDRESS = 0x22
+# Pi pin the mirrored INT output is wired to on the original board
+INTERRUPT_PIN = DEFAULT_INT_PIN
+
+
+def openHardware(name=None, topology=None):
+    if name is None:
+        name = os.environ.get("SB_HARDWARE", "pi")
+    if topology is None:
+        topology = loadTopology()
+    if name == "sim":
+        return SimHardware(
+            latencyMs=float(os.environ.get("SB_SIM_LATENCY_MS", DEFAULT_LATENCY_MS)),
+            byteUs=float(os.environ.get("SB_SIM_BYTE_US", DEFAULT_BYTE_US)),
+            topology=topology)
+    if name == "pi":
+        return PiHardware(topology)
+    raise ValueError(f"unknown hardware backend: {name}")
+
+
+def openPiBus(busId):
+    """busio.I2C for a Linux i2c bus number. Bus 1 is the header's
+    SDA/SCL; others (i2c-gpio overlays, muxes) need adafruit-extended-bus.
+    """
+    import board
+    import busio
+    if busId == DEFAULT_BUS:
+        return busio.I2C(board.SCL, board.SDA)
+    try:
+        from adafruit_extended_bus import ExtendedI2C
+    except ImportError:
+        raise RuntimeError(f"i2c bus {busId} needs adafruit-extended-bus "
+                           f"(pip install adafruit-extended-bus)")
+    return ExtendedI2C(busId)
+
+
+class PiInterruptLine:
+    def __init__(self, gpio, pin):
+        self.gpio = gpio
+        self.pin = pin
+
+    def watch(self, callback, bouncetime=50):
+        # The input chips' INT outputs are configured as mirrored, so
+        # one Pi pin covers both ports of every chip wired to it.
+        # callback gets the pin, telling the lines apart
+        self.gpio.setmode(self.gpio.BCM)
+        self.gpio.setup(self.pin, self.gpio.IN, self.gpio.PUD_UP)  # Set up Pi's pin as input, pull up
+        # As of 2024-03-23 bounctime had been 100, changed to 150
+        self.gpio.add_event_detect(self.pin, self.gpio.BOTH, callback=callback,
+                                   bouncetime=bouncetime)
+
+
+class PiHardware:
+    name = "pi"
+
+    def __init__(self, topology):
+        # Imported here so this module loads off the Pi
+        from RPi import GPIO
+        self.topology = topology
+        self.interruptLines = {pin: PiInterruptLine(GPIO, pin) for pin in topology.intPins}
+        self.buses = {}
+
+    def openChips(self):
+        """Call on the thread that will own the bus. Returns the input
+        chips and the LED chips, in topology order.
+        """
+        from adafruit_mcp230xx.mcp23017 import MCP23017
+        for busId in self.topology.buses:
+            self.buses[busId] = openPiBus(busId)
+        return ([MCP23017(self.buses[spec.bus], address=spec.address)
+                 for spec in self.topology.inputChips],
+                [MCP23017(self.buses[spec.bus], address=spec.address)
+                 for spec in self.topology.ledChips])
+
+    def openRingChip(self):
+        """After openChips, on the same thread."""
+        from adafruit_mcp230xx.mcp23017 import MCP23017
+        return MCP23017(self.buses[DEFAULT_BUS], address=RING_ADDRESS)
+
+
+class SimInterruptLine:
+    """Stands in for a Pi INT pin. The sim chips report INT level changes
+    here and the watcher is called on its own thread, like RPi.GPIO does.
+    """
+    def __init__(self, pin=INTERRUPT_PIN):
+        self.pin = pin
+        self.callback = None
+        self.level = True
+
+    def watch(self, callback, bouncetime=None):
+        # No contact bounce on the sim line
+        self.callback = callback
+
+    def levelChanged(self, level):
+        self.level = level
+        if self.callback is not None:
+            threading.Thread(target=self.callback, args=(self.pin,), daemon=True).start()
+
+
+class SimHardware:
+    name = "sim"
+
+    def __init__(self, latencyMs=DEFAULT_LATENCY_MS, byteUs=DEFAULT_BYTE_US, topology=None):
+        self.topology = topology if topology is not None else loadTopology()
+        self.interruptLines = {pin: SimInterruptLine(pin) for pin in self.topology.intPins}
+        self.inputChips = []
+        for spec in self.topology.inputChips:
+            chip = SimMCP23017(spec.address, latencyMs, byteUs)
+            chip.interruptLine = self.interruptLines[spec.intPin]
+            self.inputChips.append(chip)
+        self.ledChips = [SimMCP23017(spec.address, latencyMs, byteUs)
+                         for spec in self.topology.ledChips]
+        # First chips, as on the original board
+        self.tipChip = self.inputChips[0]
+        self.ledChip = self.ledChips[0]
+        self.ringChip = SimMCP23017(RING_ADDRESS, latencyMs, byteUs)
+
+    def openChips(self):
+        return self.inputChips, self.ledChips
+
+    def openRingChip(self):
+        return self.ringChip
+
+    # ---- driving the simulated board ----
+    def plug(self, jackIdx, lineIdx=0):
+        chipIdx, pin = self.topology.jackPin(jackIdx)
+        # A line 0 cord grounds the ring too (first chip's jacks only).
+        # Set first, so the tip's interrupt finds the ring already settled
+        if lineIdx == 0 and chipIdx == 0:
+            self.ringChip.drive(pin, False)
+        # Tip grounds the pin
+        self.inputChips[chipIdx].drive(pin, False)
+
+    def unplug(self, jackIdx):
+        chipIdx, pin = self.topology.jackPin(jackIdx)
+        self.inputChips[chipIdx].drive(pin, None)
+        if chipIdx == 0:
+            self.ringChip.drive(pin, None)
+
+    def pressButton(self, role="start"):
+        chipIdx, pin = self.topology.buttons[role]
+        self.inputChips[chipIdx].drive(pin, False)
+
+    def releaseButton(self, role="start"):
+        chipIdx, pin = self.topology.buttons[role]
+        self.inputChips[chipIdx].drive(pin, None)
+
+    def busTransactions(self):
+        return sum(chip.transactions for chip in self.inputChips + self.ledChips)
+
+    def litLEDs(self):
+        # Global LED bits whose output latch is high
+        bits = 0
+        for chip, runs in zip(self.ledChips, self.topology.ledRuns):
+            with chip.lock:
+                port = chip.portValue() & ~chip._u16(IODIRA) & 0xFFFF
+            bits |= gather(runs, port)
+        return bits
@@ -0,0 +1,136 @@
+"""Single thread that owns the I2C bus.
+
+Every MCP23017 transaction is queued here instead of running on the Qt
+thread (or the RPi.GPIO thread), so a slow or NAKed transfer can't stall
+captions and timers. Lower priority numbers run first: interrupt captures
+beat pin reads, which beat configuration, which beat LED writes. Commands
+of equal priority keep their submit order.
+
+On a board with more than one bus (topology.py), BusPool gives each bus
+its own thread, so a scan started here reads every bus at once.
+"""
+import itertools
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+PRIORITY_INTERRUPT = 0
+PRIORITY_INPUT = 1
+PRIORITY_CONFIG = 2
+PRIORITY_LED = 3
+
+PRIORITY_NAMES = {
+    PRIORITY_INTERRUPT: "interrupt",
+    PRIORITY_INPUT: "input",
+    PRIORITY_CONFIG: "config",
+    PRIORITY_LED: "led",
+}
+
+# Sorts after every real command, so a stop lets queued work finish
+_STOP_PRIORITY = 99
+
+
+class I2CWorker(threading.Thread):
+    def __init__(self):
+        super().__init__(name="i2c-worker", daemon=True)
+        self.commands = queue.PriorityQueue()
+        # Tie-break so equal priorities run in submit order
+        self._sequence = itertools.count()
+        self._statsLock = threading.Lock()
+        self.maxDepth = 0
+        self.counts = {priority: 0 for priority in PRIORITY_NAMES}
+        self.busTime = {priority: 0.0 for priority in PRIORITY_NAMES}
+        self.maxBusTime = {priority: 0.0 for priority in PRIORITY_NAMES}
+        self.errors = 0
+
+    def submit(self, priority, fn, *args):
+        """Queue fn(*args) to run on the bus thread. Returns a Future;
+        use add_done_callback plus a Qt signal to get the result back
+        onto the Qt thread.
+        """
+        future = Future()
+        self.commands.put((priority, next(self._sequence), fn, args, future))
+        depth = self.commands.qsize()
+        if depth > self.maxDepth:
+            self.maxDepth = depth
+        return future
+
+    def call(self, priority, fn, *args):
+        """Blocking version of submit, for setup and reset."""
+        return self.submit(priority, fn, *args).result()
+
+    def stop(self):
+        self.commands.put((_STOP_PRIORITY, next(self._sequence), None, (), None))
+
+    def run(self):
+        while True:
+            priority, seq, fn, args, future = self.commands.get()
+            if fn is None:
+                break
+            if not future.set_running_or_notify_cancel():
+                continue
+            startTime = time.perf_counter()
+            try:
+                result = fn(*args)
+            except Exception as err:
+                self.errors += 1
+                print(f" * i2c {PRIORITY_NAMES[priority]} command failed: {err}")
+                future.set_exception(err)
+            else:
+                future.set_result(result)
+            elapsed = time.perf_counter() - startTime
+            with self._statsLock:
+                self.counts[priority] += 1
+                self.busTime[priority] += elapsed
+                if elapsed > self.maxBusTime[priority]:
+                    self.maxBusTime[priority] = elapsed
+
+    def stats(self):
+        with self._statsLock:
+            return {
+                "depth": self.commands.qsize(),
+                "maxDepth": self.maxDepth,
+                "errors": self.errors,
+                "priorities": {
+                    PRIORITY_NAMES[priority]: {
+                        "count": self.counts[priority],
+                        "totalMs": self.busTime[priority] * 1000,
+                        "meanMs": (self.busTime[priority] * 1000 / self.counts[priority]
+                                   if self.counts[priority] else 0.0),
+                        "maxMs": self.maxBusTime[priority] * 1000,
+                    }
+                    for priority in PRIORITY_NAMES
+                },
+            }
+
+    def report(self):
+        stats = self.stats()
+        lines = [f" * i2c queue depth: {stats['depth']} (max {stats['maxDepth']}),"
+                 f" errors: {stats['errors']}"]
+        for name, entry in stats["priorities"].items():
+            lines.append(f"   {name:9} n={entry['count']:6}  mean {entry['meanMs']:.2f} ms"
+                         f"  max {entry['maxMs']:.2f} ms  total {entry['totalMs']:.0f} ms")
+        return "\n".join(lines)
+
+
+class BusPool:
+    """A thread per I2C bus. With a single bus there are no threads and
+    work runs on the caller (the I2CWorker thread), as before.
+    """
+    def __init__(self, buses):
+        self.executors = {}
+        if len(buses) > 1:
+            self.executors = {bus: ThreadPoolExecutor(1, thread_name_prefix=f"i2c-bus{bus}")
+                              for bus in buses}
+
+    def runPerBus(self, jobs):
+        """{bus: fn} -> {bus: fn()}, the buses in parallel."""
+        if len(jobs) < 2 or not self.executors:
+            return {bus: fn() for bus, fn in jobs.items()}
+        futures = {bus: self.executors[bus].submit(fn) for bus, fn in jobs.items()}
+        return {bus: future.result() for bus, future in futures.items()}
+
+    def shutdown(self):
+        for executor in self.executors.values():
+            executor.shutdown(wait=True)
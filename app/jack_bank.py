@@ -0,0 +1,236 @@
+"""Board-state layer for the MCP23017 jack bank (tip chip at 0x20).
+
+GPIOA and GPIOB are read together in one I2C transaction and every pin
+query for that event is answered from the resulting 16 bit snapshot,
+instead of one register read per pin through get_pin().value.
+
+Two-line boards also have a ring chip (0x22) on the stereo jacks: a
+line 0 cord grounds the ring as well as the tip, a line 1 cord only the
+tip. scan() reads tip then ring back to back, one burst each, under one
+timestamp, and the JackScan answers plugged and line for every jack.
+
+Boards with more input chips (topology.py) use JackArray, which has the
+same read/capture calls but answers in global bits: jack j is bit j and
+the buttons follow the jacks.
+"""
+import time
+
+from topology import gather
+
+# Pins 0-11 are phone jacks, 12-15 are buttons (13 is Start)
+JACK_COUNT = 12
+JACK_MASK = (1 << JACK_COUNT) - 1
+START_BUTTON = 13
+
+# INTFA, INTFB, INTCAPA, INTCAPB are consecutive (IOCON.BANK = 0)
+_MCP23017_INTFA = 0x0E
+
+
+class PortSnapshot:
+    """Picture of the tip chip (16 bits), or of a JackArray's global
+    port, at one moment.
+    Pins are pulled up, so a plugged jack (grounded by the tip) is a 0 bit.
+    """
+    __slots__ = ('bits', 'jackMask')
+
+    def __init__(self, bits, jackMask=JACK_MASK):
+        self.bits = bits
+        self.jackMask = jackMask
+
+    def value(self, pinIdx):
+        # Same meaning as self.pins[pinIdx].value in control.py
+        return bool((self.bits >> pinIdx) & 1)
+
+    def isGrounded(self, pinIdx):
+        return not (self.bits >> pinIdx) & 1
+
+    def groundedJacks(self):
+        # Bitmask of jacks with a plug in
+        return ~self.bits & self.jackMask
+
+    def anyJacksIn(self):
+        return self.groundedJacks() != 0
+
+    def __repr__(self):
+        return f"PortSnapshot({self.bits:0{self.jackMask.bit_length() + 4}b})"
+
+
+class JackScan:
+    """Tip and ring ports read together at stamp (time.monotonic()).
+    ringBits is None on a board without a ring chip -- everything is on
+    line 0.
+    """
+    __slots__ = ('tip', 'ringBits', 'stamp')
+
+    def __init__(self, tipBits, ringBits, stamp):
+        self.tip = PortSnapshot(tipBits)
+        self.ringBits = None if ringBits is None else ringBits & 0xFFFF
+        self.stamp = stamp
+
+    def isPlugged(self, jackIdx):
+        return jackIdx < JACK_COUNT and self.tip.isGrounded(jackIdx)
+
+    def pluggedMask(self):
+        return self.tip.groundedJacks()
+
+    def lineMask(self, lineIdx):
+        """Plugged jacks whose cord is on lineIdx."""
+        plugged = self.tip.groundedJacks()
+        if self.ringBits is None:
+            return plugged if lineIdx == 0 else 0
+        # Ring still high under a grounded tip: the line 1 cord
+        onLine1 = plugged & self.ringBits
+        return onLine1 if lineIdx == 1 else plugged & ~onLine1
+
+    def lineOf(self, jackIdx):
+        """Line of the cord in the jack, -1 if it is empty."""
+        if not self.isPlugged(jackIdx):
+            return -1
+        if self.ringBits is None:
+            return 0
+        return (self.ringBits >> jackIdx) & 1
+
+    def decode(self):
+        """{jackIdx: lineIdx} for every plugged jack."""
+        return {jackIdx: self.lineOf(jackIdx) for jackIdx in range(JACK_COUNT)
+                if self.isPlugged(jackIdx)}
+
+    def __repr__(self):
+        ring = "-" if self.ringBits is None else f"{self.ringBits:016b}"
+        return f"JackScan(tip {self.tip.bits:016b}, ring {ring})"
+
+
+class JackBank:
+    """Wraps the tip MCP23017, and the ring one if the board has it,
+    and keeps the latest snapshot.
+    """
+    def __init__(self, mcp, ringMcp=None):
+        self.mcp = mcp
+        self.ringMcp = ringMcp
+        # All high (nothing plugged) until the first read
+        self.snapshot = PortSnapshot(0xFFFF)
+        self.lastScan = JackScan(0xFFFF, None if ringMcp is None else 0xFFFF, 0.0)
+        # Preallocated so the interrupt thread doesn't allocate
+        self._intRegister = bytes([_MCP23017_INTFA])
+        self._intBuffer = bytearray(4)
+
+    def configureInputs(self):
+        """Whole-chip setup as bulk 16 bit register writes: IODIR and GPPU
+        for all 16 tip pins, GPINTEN and INTCON, then clear the interrupt.
+        Replaces setting direction and pull pin by pin.
+        """
+        self.mcp.iodir = 0xFFFF  # All inputs
+        self.mcp.gppu = 0xFFFF  # All pulled up -- a plug grounds the pin
+        self.mcp.interrupt_enable = 0xFFFF  # Enable Interrupts in all pins
+        # If intcon is set to 0's we will get interrupts on both
+        #  button presses and button releases
+        self.mcp.interrupt_configuration = 0x0000  # interrupt on any change
+        self.mcp.io_control = 0x44  # Interrupt as open drain and mirrored
+        self.mcp.clear_ints()  # Interrupts need to be cleared initially
+        if self.ringMcp is not None:
+            # Ring is only read alongside the tip, never interrupts
+            self.ringMcp.iodir = 0xFFFF
+            self.ringMcp.gppu = 0xFFFF
+            self.ringMcp.interrupt_enable = 0x0000
+
+    def read(self):
+        """One burst read of GPIOA+GPIOB, shared by everything that
+        handles the current event.
+        """
+        self.snapshot = PortSnapshot(self.mcp.gpio)
+        return self.snapshot
+
+    def readRing(self):
+        return None if self.ringMcp is None else self.ringMcp.gpio
+
+    def scan(self):
+        """Tip then ring, one burst each and nothing in between."""
+        stamp = time.monotonic()
+        tipBits = self.mcp.gpio
+        ringBits = self.readRing()
+        self.snapshot = PortSnapshot(tipBits)
+        self.lastScan = JackScan(tipBits, ringBits, stamp)
+        return self.lastScan
+
+    def readInterruptCapture(self):
+        """INTF and INTCAP in one 4 byte burst. Returns (intFlag, intCap)
+        as 16 bit ints. INTCAP is the whole port as latched at the moment
+        of the interrupt, so the edge value is right even if the pin has
+        moved since. Reading it also clears the interrupt.
+        """
+        buf = self._intBuffer
+        with self.mcp._device as i2c:
+            i2c.write_then_readinto(self._intRegister, buf)
+        return (buf[0] | buf[1] << 8), (buf[2] | buf[3] << 8)
+
+    def captureScan(self, stamp):
+        """readInterruptCapture plus the ring port straight after.
+        Returns (intFlag, JackScan) with the tip as latched in INTCAP.
+        """
+        intFlag, intCap = self.readInterruptCapture()
+        self.lastScan = JackScan(intCap, self.readRing(), stamp)
+        return intFlag, self.lastScan
+
+
+class JackArray:
+    """Every input chip of a BoardTopology as one port, one JackBank per
+    chip. Chips on different buses are read in parallel through the
+    BusPool; chips on the same bus one after the other.
+    """
+    def __init__(self, topology, chips, busPool):
+        self.topology = topology
+        self.banks = [JackBank(chip) for chip in chips]
+        self.busPool = busPool
+        self.jackMask = topology.jackMask
+        # Chip indexes by bus, and by the GPIO their INT is wired to
+        self.chipsByBus = {}
+        for chipIdx, spec in enumerate(topology.inputChips):
+            self.chipsByBus.setdefault(spec.bus, []).append(chipIdx)
+        self.chipsByPin = {pin: topology.inputsOnPin(pin) for pin in topology.intPins}
+        # Latest port of every chip, all high until the first read
+        self.chipPorts = [0xFFFF] * len(self.banks)
+        self.snapshot = PortSnapshot(self._globalBits(), self.jackMask)
+
+    def _globalBits(self):
+        bits = 0
+        for runs, port in zip(self.topology.inputRuns, self.chipPorts):
+            bits |= gather(runs, port)
+        return bits
+
+    def _perBus(self, chipIdxs, fn):
+        """fn(bank) for the chips, a thread per bus. {chipIdx: result}"""
+        jobs = {}
+        for bus, busChips in self.chipsByBus.items():
+            wanted = [chipIdx for chipIdx in busChips if chipIdx in chipIdxs]
+            if wanted:
+                jobs[bus] = (lambda wanted=wanted:
+                             [(chipIdx, fn(self.banks[chipIdx])) for chipIdx in wanted])
+        results = {}
+        for pairs in self.busPool.runPerBus(jobs).values():
+            results.update(pairs)
+        return results
+
+    def configureInputs(self):
+        self._perBus(range(len(self.banks)), JackBank.configureInputs)
+
+    def read(self):
+        """Every input chip, one burst each."""
+        for chipIdx, snapshot in self._perBus(range(len(self.banks)), JackBank.read).items():
+            self.chipPorts[chipIdx] = snapshot.bits
+        self.snapshot = PortSnapshot(self._globalBits(), self.jackMask)
+        return self.snapshot
+
+    def readInterruptCapture(self, intPin=None):
+        """INTF+INTCAP of the chips on that INT line (all chips if None)
+        as global (intFlag, intCap). Chips that didn't interrupt keep
+        their last port -- their INTCAP is from some earlier change.
+        """
+        chipIdxs = self.chipsByPin.get(intPin, range(len(self.banks)))
+        intFlag = 0
+        for chipIdx, (flag, cap) in self._perBus(chipIdxs, JackBank.readInterruptCapture).items():
+            if flag:
+                self.chipPorts[chipIdx] = cap
+                intFlag |= gather(self.topology.inputRuns[chipIdx], flag)
+        intCap = self._globalBits()
+        self.snapshot = PortSnapshot(intCap, self.jackMask)
+        return intFlag, intCap
@@ -0,0 +1,154 @@
+"""Plug-to-response latency trace.
+
+A trace starts when a jack's interrupt is captured and collects named
+trace points as the event moves through the app: debounce timer, settled
+edge, model handler, LED delivery, buzzer stop, VLC playing. Each mark is
+recorded against the previous mark and against the start of the trace, in
+small fixed-bucket histograms kept in memory.
+
+dump() prints the table, then any reports added with addReport (bus,
+poller, scheduler state). It runs at exit, on SIGUSR1 (kill -USR1 <pid>),
+and writes the table as JSON as well when SB_LATENCY_FILE is set.
+"""
+import atexit
+import json
+import os
+import signal
+import threading
+import time
+
+# Bucket upper bounds in ms, last one catches the rest
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, float("inf"))
+# Traces older than this are dropped rather than matched to new marks
+STALE_AFTER_S = 10.0
+
+
+class Histogram:
+    __slots__ = ("counts", "count", "total", "low", "high")
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS_MS)
+        self.count = 0
+        self.total = 0.0
+        self.low = float("inf")
+        self.high = 0.0
+
+    def add(self, ms):
+        for idx, bound in enumerate(BUCKETS_MS):
+            if ms <= bound:
+                self.counts[idx] += 1
+                break
+        self.count += 1
+        self.total += ms
+        self.low = min(self.low, ms)
+        self.high = max(self.high, ms)
+
+    def asDict(self):
+        return {
+            "count": self.count,
+            "meanMs": self.total / self.count if self.count else 0.0,
+            "minMs": self.low if self.count else 0.0,
+            "maxMs": self.high,
+            "buckets": {("inf" if bound == float("inf") else str(bound)): n
+                        for bound, n in zip(BUCKETS_MS, self.counts)},
+        }
+
+
+class LatencyTrace:
+    def __init__(self):
+        self.lock = threading.Lock()
+        # pinIdx -> {"start": t, "last": t, "lastPoint": name, "points": set}
+        self.open = {}
+        self.histograms = {}
+        # Callables returning text, printed after the table
+        self.reports = []
+
+    def addReport(self, report):
+        self.reports.append(report)
+
+    def _record(self, stage, ms):
+        histogram = self.histograms.get(stage)
+        if histogram is None:
+            histogram = self.histograms[stage] = Histogram()
+        histogram.add(ms)
+
+    def begin(self, pinIdx, stamp=None, point="interrupt"):
+        """Start a trace for this jack unless one is already running
+        (contact chatter gives several interrupts per plug).
+        """
+        if stamp is None:
+            stamp = time.monotonic()
+        with self.lock:
+            current = self.open.get(pinIdx)
+            if current is not None and stamp - current["start"] < STALE_AFTER_S \
+                    and "settled" not in current["points"]:
+                return
+            self.open[pinIdx] = {"start": stamp, "last": stamp,
+                                 "lastPoint": point, "points": {point}}
+
+    def _markLocked(self, pinIdx, point, stamp):
+        current = self.open.get(pinIdx)
+        if current is None or point in current["points"]:
+            return
+        if stamp - current["start"] > STALE_AFTER_S:
+            del self.open[pinIdx]
+            return
+        self._record(f"{current['lastPoint']} -> {point}", (stamp - current["last"]) * 1000)
+        if current["last"] != current["start"]:
+            # Running total from the interrupt as well
+            self._record(f"interrupt -> {point}", (stamp - current["start"]) * 1000)
+        current["last"] = stamp
+        current["lastPoint"] = point
+        current["points"].add(point)
+
+    def mark(self, pinIdx, point, stamp=None):
+        if stamp is None:
+            stamp = time.monotonic()
+        with self.lock:
+            self._markLocked(pinIdx, point, stamp)
+
+    def markMask(self, pinMask, point, stamp=None):
+        """Mark the traces of every jack in pinMask, for points that
+        several jacks can be waiting on at once (the debounce timer).
+        """
+        if stamp is None:
+            stamp = time.monotonic()
+        with self.lock:
+            for pinIdx in list(self.open):
+                if (pinMask >> pinIdx) & 1:
+                    self._markLocked(pinIdx, point, stamp)
+
+    def finish(self, pinIdx):
+        # Done, or nothing more will happen for it (unplugs, ignored edges)
+        with self.lock:
+            self.open.pop(pinIdx, None)
+
+    def snapshot(self):
+        with self.lock:
+            return {stage: histogram.asDict()
+                    for stage, histogram in sorted(self.histograms.items())}
+
+    def requestDump(self, *_signalArgs):
+        # SIGUSR1 handler. It runs on the main thread, which may be inside
+        # mark() holding the lock, so the dump waits on a thread of its own
+        threading.Thread(target=self.dump, name="latency-dump", daemon=True).start()
+
+    def dump(self):
+        stages = self.snapshot()
+        print(" * latency by stage (ms)")
+        for stage, entry in stages.items():
+            print(f"   {stage:36} n={entry['count']:5}  mean {entry['meanMs']:7.1f}"
+                  f"  min {entry['minMs']:7.1f}  max {entry['maxMs']:7.1f}")
+        for report in self.reports:
+            print(report())
+        outFile = os.environ.get("SB_LATENCY_FILE")
+        if outFile:
+            with open(outFile, "w") as f:
+                json.dump(stages, f, indent=2)
+
+
+# Shared by control.py and model.py
+trace = LatencyTrace()
+atexit.register(trace.dump)
+if hasattr(signal, "SIGUSR1") and threading.current_thread() is threading.main_thread():
+    signal.signal(signal.SIGUSR1, trace.requestDump)
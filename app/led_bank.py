@@ -0,0 +1,136 @@
+"""Shadow-register driver for the LED MCP23017 (0x21).
+
+LED changes only touch an in-memory copy of the output latch. flush()
+writes the whole latch in one I2C transaction, and only if it changed,
+so turning off two LEDs (clearTheLine) or all twelve (reset) is one write
+instead of a read-modify-write per pin.
+
+LedArray is the same for a topology with several LED chips (topology.py):
+the shadow holds global LED bits, and a flush writes only the chips whose
+part of it changed, a thread per bus.
+"""
+from topology import scatter
+
+LED_COUNT = 12
+LED_MASK = (1 << LED_COUNT) - 1
+
+
+class LedBank:
+    def __init__(self, mcp):
+        self.mcp = mcp
+        self.shadow = 0
+        # What we last wrote to the chip. None forces the next flush
+        self.latched = None
+        # Bumped by configureOutputs, so latch writes queued before it
+        # are dropped instead of turning LEDs back on after a reset
+        self.generation = 0
+
+    def configureOutputs(self):
+        """Pins 0-11 to output, all off -- two writes in total."""
+        self.generation += 1
+        self.shadow = 0
+        self.latched = None
+        self.mcp.iodir = 0xFFFF & ~LED_MASK
+        self.flush()
+
+    def set(self, ledIdx, onOrOff):
+        if onOrOff:
+            self.shadow |= 1 << ledIdx
+        else:
+            self.shadow &= ~(1 << ledIdx)
+
+    def setMask(self, mask, onOrOff):
+        if onOrOff:
+            self.shadow |= mask & LED_MASK
+        else:
+            self.shadow &= ~mask
+
+    def toggle(self, ledIdx):
+        self.shadow ^= 1 << ledIdx
+
+    def get(self, ledIdx):
+        return bool((self.shadow >> ledIdx) & 1)
+
+    def load(self, bits):
+        # Whole latch at once, e.g. from board_state's lit mask
+        self.shadow = bits & LED_MASK
+
+    def allOff(self):
+        self.shadow = 0
+
+    def isDirty(self):
+        return self.shadow != self.latched
+
+    def takeDirty(self):
+        """Latch value to write, or None if the chip is already current.
+        Marks it written, so the caller must pass it to writeLatch --
+        done this way so the I2C thread never reads a half-updated shadow.
+        Pass self.generation along with it when the write is queued.
+        """
+        if self.shadow == self.latched:
+            return None
+        self.latched = self.shadow
+        return self.latched
+
+    def isStale(self, generation):
+        return generation is not None and generation != self.generation
+
+    def writeLatch(self, bits, generation=None):
+        if self.isStale(generation):
+            return
+        self.mcp.gpio = bits
+
+    def flush(self):
+        """Write the shadow to the output latch if anything changed."""
+        bits = self.takeDirty()
+        if bits is not None:
+            self.writeLatch(bits)
+
+
+class LedArray(LedBank):
+    def __init__(self, topology, chips, busPool):
+        super().__init__(None)
+        self.topology = topology
+        self.chips = chips
+        self.busPool = busPool
+        self.ledMask = topology.ledMask
+        # What each chip's latch holds. None forces the next write
+        self.chipLatched = [None] * len(chips)
+
+    def configureOutputs(self):
+        self.generation += 1
+        self.shadow = 0
+        self.latched = None
+        self.chipLatched = [None] * len(self.chips)
+        for chip, pinMask in zip(self.chips, self.topology.ledPinMasks):
+            chip.iodir = 0xFFFF & ~pinMask
+        self.flush()
+
+    def setMask(self, mask, onOrOff):
+        if onOrOff:
+            self.shadow |= mask & self.ledMask
+        else:
+            self.shadow &= ~mask
+
+    def load(self, bits):
+        self.shadow = bits & self.ledMask
+
+    def writeLatch(self, bits, generation=None):
+        """Runs on the i2c thread. One GPIO write per chip that changed."""
+        if self.isStale(generation):
+            return
+        jobs = {}
+        for chipIdx, runs in enumerate(self.topology.ledRuns):
+            port = scatter(runs, bits)
+            if port == self.chipLatched[chipIdx]:
+                continue
+            self.chipLatched[chipIdx] = port
+            bus = self.topology.ledChips[chipIdx].bus
+            jobs.setdefault(bus, []).append((self.chips[chipIdx], port))
+        self.busPool.runPerBus({bus: (lambda writes=writes: self._write(writes))
+                                for bus, writes in jobs.items()})
+
+    @staticmethod
+    def _write(writes):
+        for chip, port in writes:
+            chip.gpio = port
@@ -0,0 +1,55 @@
+"""Media registry: every VLC Media the game can play, created and parsed
+once at startup.
+
+Keys are the file names without .mp3 -- the helloFile / convoFile /
+retryAfterWrongFile / wrongNumFile values from conversations.json and
+persons.json, plus the fixed clips (buzzer, ring tone, Welcome,
+FinishedActivity). Playback looks a Media up by key instead of calling
+media_new_path on every play, and the registry releases them all when the
+app shuts down.
+"""
+import os
+
+import vlc
+
+from content_bundle import AUDIO_DIR, contentClipNames
+
+
+class MediaRegistry:
+    def __init__(self, instance, audioDir=AUDIO_DIR):
+        self.instance = instance
+        self.audioDir = audioDir
+        self.media = {}
+        self.missing = []
+
+    def add(self, key):
+        path = os.path.join(self.audioDir, key + ".mp3")
+        if not os.path.exists(path):
+            self.missing.append(key)
+            print(f" * missing audio file: {path}")
+        media = self.instance.media_new_path(path)
+        # Parse now (local only, in the background) so play doesn't have to
+        media.parse_with_options(vlc.MediaParseFlag.local, 0)
+        self.media[key] = media
+        return media
+
+    def addContent(self, conversations, persons):
+        for key in contentClipNames(conversations, persons):
+            if key not in self.media:
+                self.add(key)
+
+    def get(self, key):
+        media = self.media.get(key)
+        if media is None:
+            # Not known at startup -- create it once and keep it
+            media = self.add(key)
+        return media
+
+    def release(self, key):
+        media = self.media.pop(key, None)
+        if media is not None:
+            media.release()
+
+    def releaseAll(self):
+        for key in list(self.media):
+            self.release(key)
@@ -1,21 +1,87 @@
 # import sys
-import json
+import time
+from functools import partial
 from PyQt5 import QtWidgets as qtw
 from PyQt5 import QtGui as qtg
 from PyQt5 import QtCore as qtc
-import vlc
 
-conversationsJsonFile = open('conversations.json')
-conversations = json.load(conversationsJsonFile)
-personsJsonFile = open('persons.json')
-persons = json.load(personsJsonFile)
+from content_bundle import loadContent
+from latency import trace
+from board_state import board
+from debounce import UNPLUG_STABLE_MS
+from dual_unplug import DualUnplugDetector
+from audio_backend import openAudioEngine
+from scheduler import scheduler
+
+# Compiled bundle (build_bundle.py) if there is one, else the json files
+content = loadContent()
+conversations = content.conversations
+persons = content.persons
+
+
+# Call status of a line, PhoneLine.unPlugStatus
+NO_UNPLUG_STATUS = 0
+WRONG_NUM_IN_PROGRESS = 1
+OP_ONLY_IN_PROGRESS = 2
+REPLUG_IN_PROGRESS = 3
+CALLER_UNPLUGGED = 5
+# Caller/callee index before anyone has been plugged into a line
+NO_JACK = 99
+
+
+def isOperatorOnly(convoIdx):
+    # These calls have no full convo -- they end after the hello
+    return not conversations[convoIdx]["convoFile"]
+
+
+class PhoneLine:
+    """One pair of cords: the call on it and its own audio players
+    (tone, voice and retry, named with the line index).
+    """
+    def __init__(self, lineIdx):
+        self.lineIdx = lineIdx
+        self.tone = f"tone{lineIdx}"
+        self.voice = f"voice{lineIdx}"
+        self.retry = f"retry{lineIdx}"
+        self.callerIdx = NO_JACK
+        self.calleeIdx = NO_JACK
+        # Conversation this line is carrying, set when the caller is answered
+        self.convoIdx = 0
+        # Jack whose plug-in started this line's audio, for the latency trace
+        self.tracePin = NO_JACK
+        self.clear()
+
+    def clear(self):
+        # Who was on the line (callerIdx, calleeIdx) is kept
+        self.isEngaged = False
+        self.unPlugStatus = NO_UNPLUG_STATUS
+        self.callerPlugged = False
+        self.calleePlugged = False
+
+    @property
+    def playerNames(self):
+        return (self.tone, self.voice, self.retry)
+
+    def __repr__(self):
+        return (f"line {self.lineIdx}: convo {self.convoIdx} status {self.unPlugStatus} "
+                f"engaged {self.isEngaged} caller {self.callerIdx} "
+                f"{'in' if self.callerPlugged else 'out'} callee {self.calleeIdx} "
+                f"{'in' if self.calleePlugged else 'out'}")
+
 
 class Model(qtc.QObject):
-    """Main logic patterned after software proto
+    """Main logic patterned after software proto, for a board with
+    lineCount pairs of cords. Each line keeps its own call state and
+    players, but currConvo and currCallerIndex are board-wide, so calls
+    still ring and connect one at a time and only one line is ever
+    engaged. The mixer can carry a voice per line; the game doesn't yet.
     """
     # The following signals are connected in/ called from control.py
     displayTextSignal = qtc.pyqtSignal(str)
     setLEDSignal = qtc.pyqtSignal(int, bool)
+    # Several LEDs at once, as a bitmask -- one I2C write in control.
+    # object, as an int signal argument would cut the mask at 32 bits
+    setLEDMaskSignal = qtc.pyqtSignal(object, bool)
     # pinInEvent = qtc.pyqtSignal(int, bool)
     blinkerStart = qtc.pyqtSignal(int)
     blinkerStop = qtc.pyqtSignal()
@@ -24,111 +90,94 @@ class Model(qtc.QObject):
     startResetSignal = qtc.pyqtSignal()
     # Doesn't seem to be used
     checkPinsInEvent = qtc.pyqtSignal() 
-    
-    # The following signals are local
-    # Need to avoid thread conflicts
-    setTimeToNextSignal = qtc.pyqtSignal(int)
-    setTimeToEndSignal = qtc.pyqtSignal(int)
-    checkDualUnplugSignal = qtc.pyqtSignal(int)
-    playRequestCorrectSignal = qtc.pyqtSignal()
-
-    buzzInstace = vlc.Instance()
-    buzzPlayer = buzzInstace.media_player_new()
-    buzzPlayer.set_media(buzzInstace.media_new_path("/home/piswitch/Apps/sb-audio/buzzer.mp3"))
-    buzzEvents = buzzPlayer.event_manager()
-
-    toneInstace = vlc.Instance()
-    tonePlayer = toneInstace.media_player_new()
-    toneEvents = tonePlayer.event_manager()
-    toneMedia = toneInstace.media_new_path("/home/piswitch/Apps/sb-audio/outgoing-ring.mp3")
-    tonePlayer.set_media(toneMedia)
-
-    vlcInstance = vlc.Instance()
-    vlcPlayer = vlcInstance.media_player_new()
-    vlcEvent = vlcPlayer.event_manager()
-
-    dualUnplugTimer = qtc.QTimer()
-    dualUnplugTimer.setSingleShot(True)
-    # connect defined in _init_    
-
-    def __init__(self):
+    # Delayed steps (next call, reconnect, dual unplug, reset at end) go
+    # through scheduler.callLater, which is safe from VLC callbacks
+
+    def __init__(self, lineCount=1):
         super().__init__()
-        self.callInitTimer = qtc.QTimer()
-        self.callInitTimer.setSingleShot(True)
-        self.callInitTimer.timeout.connect(self.initiateCall)
-        # signal is calling function setTimeToNext which calls callInitTimer
-        # self.setTimeToNextSignal.connect(self.setTimeToNext)
-        self.setTimeToNextSignal.connect(self.callInitTimer.start)
-
-        self.reconnectTimer = qtc.QTimer()
-        self.reconnectTimer.setSingleShot(True)
-        self.reconnectTimer.timeout.connect(self.reCall)
-
-        self.resetEndTimer = qtc.QTimer()
-        self.resetEndTimer.setSingleShot(True)
-        # self.resetEndTimer.timeout.connect(self.startResetSignal.emit())
-        self.resetEndTimer.timeout.connect(self.resetAtEnd)
-
-        self.playRequestCorrectSignal.connect(self.playRequestCorrect)
-        self.setTimeToEndSignal.connect(self.startEndTimer)
-        # signal calls timeer directly
-        self.checkDualUnplugSignal.connect(self.dualUnplugTimer.start)
-        self.dualUnplugTimer.timeout.connect(self.checkDualUnplug)
+        self.lines = [PhoneLine(lineIdx) for lineIdx in range(lineCount)]
+        board.setLineCount(lineCount)
+        # libVLC or in-memory PCM (SB_AUDIO, see audio_backend.py). One
+        # buzzer, then tone, voice and retry for each line. "retry" holds
+        # the request-correct clip ready while wrong num plays
+        playerNames = ["buzzer"]
+        for line in self.lines:
+            playerNames.extend(line.playerNames)
+        self.audio = openAudioEngine(playerNames)
+        # Every clip, created once. Looked up by file name
+        self.mediaRegistry = self.audio.media
+        self.mediaRegistry.addContent(conversations, persons)
+        # Outlives reset() so the learned window carries over between games
+        self.dualUnplug = DualUnplugDetector()
+        # Latency trace points -- separate from end-of-clip callbacks
+        for line in self.lines:
+            self.audio.onPlaying(line.tone, partial(self.traceTonePlaying, line))
+            self.audio.onPlaying(line.voice, partial(self.traceVoicePlaying, line))
         self.reset()
 
     def reset(self):
         self.stopAllAudio()
         self.stopTimers()
-        # Put pinsIn here in model where it's used more often
-        # rather than in control which would require a lot of signaling.
-        self.pinsIn = [False,False,False,False,False,False,False,False,False,False,False,False,False,False]
+        # Jacks in a call (inUse) and on each line live in the shared
+        # board state, which control also reads
+        board.resetCalls()
         self.currConvo = 0
         self.currCallerIndex = 0
         self.currCalleeIndex = 0
-        # self.whichLineInUse = -1
-        self.currStopTime = 0
-        self.currPersonIdx = 0
-        self.incrementJustCalled = False
-        # self.reCallLine = 0 # Workaround timer not having params
-        self.silencedCallLine = 0 # Workaround timer not having params
-        # self.requestCorrectLine = 0 # Workaround timer not having params
-
-        self.NO_UNPLUG_STATUS = 0
-        self.WRONG_NUM_IN_PROGRESS = 1
-        self.OP_ONLY_IN_PROGRESS = 2
-        self.REPLUG_IN_PROGRESS = 3
-        self.CALLER_UNPLUGGED = 5
-        self.phoneLine = {
-                "isEngaged": False,
-                "unPlugStatus": self.NO_UNPLUG_STATUS,
-                "caller": {"index": 99, "isPlugged": False},
-                "callee": {"index": 99, "isPlugged": False}
-                # "audioTrack": vlc.MediaPlayer("/home/piswitch/Apps/sb-audio/1-Charlie_Operator.mp3")
-            }
+        # Line whose voice the captions follow
+        self.captionLine = self.lines[0]
+        for line in self.lines:
+            line.callerIdx = NO_JACK
+            line.calleeIdx = NO_JACK
+            line.convoIdx = 0
+            line.tracePin = NO_JACK
+            line.clear()
+
+    def traceTonePlaying(self, line):
+        trace.mark(line.tracePin, "tonePlaying")
+
+    def traceVoicePlaying(self, line):
+        # Voice audio is the end of the plug-to-response path. Not while
+        # it is only being pre-rolled under the ring tone
+        if self.audio.isPrerolled(line.voice):
+            return
+        trace.mark(line.tracePin, "voicePlaying")
+        trace.finish(line.tracePin)
+        line.tracePin = NO_JACK
 
     def stopTimers(self):
-        if self.callInitTimer.isActive():
-            self.callInitTimer.stop()
-        if self.reconnectTimer.isActive():
-            self.reconnectTimer.stop()
+        for name in ("callInit", "resetEnd"):
+            scheduler.cancel(name)
+        for line in self.lines:
+            scheduler.cancel(f"reconnect{line.lineIdx}")
+            scheduler.cancel(f"dualUnplug{line.lineIdx}")
+        self.dualUnplug.cancel()
 
     def stopAllAudio(self):
-        self.buzzPlayer.stop()
-        self.tonePlayer.stop()
-        # self.vlcPlayers[0].stop()
-        self.vlcPlayer.stop()
+        # Stops every player and drops any pending end callbacks
+        self.audio.stopAll()
 
-    def setPinIn(self, pinIdx, value):
-        self.pinsIn[pinIdx] = value
+    def stopVoice(self, line):
+        self.audio.stop(line.voice)
+        self.audio.stop(line.retry)
 
-    # Used by wiggle detect in control
-    def getIsPinIn(self, pinIdx):
-        return self.pinsIn[pinIdx]
+    def releaseMedia(self):
+        """At shutdown -- players, media, then the libVLC instance."""
+        self.audio.release()
 
-    def initiateCall(self):
-        self.incrementJustCalled = False
+    def getVoiceTime(self, line=None):
+        # Playback clock for captions, ms into the voice track (-1 if idle).
+        # Defaults to the line the captions are following
+        if line is None:
+            line = self.captionLine
+        return self.audio.getTime(line.voice)
+
+    def showCaption(self, line, captionType, fileName):
+        self.captionLine = line
+        self.displayCaptionSignal.emit(captionType, fileName)
 
-        if (self.currConvo < 9):
+    def initiateCall(self):
+        if (self.currConvo < len(conversations)):
             print(f'Setting currCallerIndex to {conversations[self.currConvo]["caller"]["index"]}'
                   f' currConvo: {self.currConvo}')
             self.currCallerIndex =  conversations[self.currConvo]["caller"]["index"]
@@ -138,10 +187,8 @@ class Model(qtc.QObject):
             # be when user plugs in a plug 
             # buzzTrack.volume = .6   
 
-            self.buzzEvents.event_attach(vlc.EventType.MediaPlayerEndReached, 
-                self.restartOnTimeout) 
-
-            self.buzzPlayer.play()
+            # No answer before the buzzer runs out -- start over
+            self.audio.play("buzzer", "buzzer", self.restartOnTimeout)
             self.blinkerStart.emit(conversations[self.currConvo]["caller"]["index"])
             self.displayTextSignal.emit("Incoming call..")
             
@@ -152,187 +199,125 @@ class Model(qtc.QObject):
             print("Congratulations - done!")
             self.playFinished()
 
-    def playHello(self, _currConvo): # , lineIndex
+    def playHello(self, line):
         # print(" -- got to playHello")
-        media = self.vlcInstance.media_new_path("/home/piswitch/Apps/sb-audio/" + 
-            conversations[_currConvo]["helloFile"] + ".mp3")
-        self.vlcPlayer.set_media(media)
-        # For convo idxs 3 and 7 there is no full convo, so end after hello.
-        # Attach event before playing
-        if (_currConvo == 3 or  _currConvo == 8):
-            print(f" -- got to currConv = 3 or 8 -- Operator only ")
+        onEnd = None
+        # Operator-only calls have no full convo, so end after hello.
+        if (isOperatorOnly(line.convoIdx)):
+            print(f" -- got to currConv = {line.convoIdx} -- Operator only ")
             # Set call status to operator only
-            self.phoneLine["unPlugStatus"] = self.OP_ONLY_IN_PROGRESS
-            self.vlcEvent.event_attach(vlc.EventType.MediaPlayerEndReached, 
-                self.endOperatorOnlyHello) #  _currConvo, 
+            line.unPlugStatus = OP_ONLY_IN_PROGRESS
+            onEnd = self.endOperatorOnlyHello
 
-        # Proceed with playing -- event may or may not be attached            
-        self.vlcPlayer.play()
+        # Proceed with playing -- with or without an end callback
+        self.audio.play(line.voice, conversations[line.convoIdx]["helloFile"], onEnd, line)
         # Send msg to screen
-        self.displayCaptionSignal.emit('hello', conversations[_currConvo]["helloFile"])
-
+        self.showCaption(line, 'hello', conversations[line.convoIdx]["helloFile"])
 
-    def endOperatorOnlyHello(self, event): # , lineIndex
-        print("  - About to detach vlcEvent in endOperatorOnlyHello")
 
-        if ( event != None):
-            self.toneEvents.event_detach(vlc.EventType.MediaPlayerEndReached)
+    def endOperatorOnlyHello(self, line):
+        print(f"  - got to endOperatorOnlyHello, line {line.lineIdx}")
+        # Either the hello ended or the caller unplugged near the end
+        self.audio.cancel(line.voice)
 
         #  supress further callbacks self.supressCallback
         # Don't know what this did in software proto
         # setHelloOnlyCompleted(lineIndex)
-        self.clearTheLine() # lineIndex
+        self.clearTheLine(line)
         print(f" - Hello-only ended.  Bump currConvo from {self.currConvo}")
-        self.currConvo += 1
-        # Timers can't be started from another thread
-        # If convo index is 8 we'll restart in 
-        self.setTimeToNextSignal.emit(1000)
+        self.currConvo = line.convoIdx + 1
+        scheduler.callLater(1000, self.initiateCall, name="callInit")
 
-    def playConvo(self, currConvo): # , lineIndex
+    def playConvo(self, line):
         """
         This just plays the outgoing tone and then starts the full convo
         """
-        print(f" -- got to play convo, currConvo: {currConvo}")
-        # Long VLC way of creating callback
-        self.toneEvents.event_attach(vlc.EventType.MediaPlayerEndReached, 
-            self.playFullConvo, currConvo) # playFullConvo(currConvo, lineIndex)
-        self.tonePlayer.set_media(self.toneMedia)
-        self.tonePlayer.play()
-
-    def playFullConvo(self, event, _currConvo):
-        # Stop tone events from calling more times
-        # print("  - About to detach toneEvent playFullConvo")
-        if ( event != None):
-            self.toneEvents.event_detach(vlc.EventType.MediaPlayerEndReached)
-
-        print(f" -- PlayFullConvo {_currConvo}")
-        # Set callback for convo track finish
-        self.vlcEvent.event_attach(vlc.EventType.MediaPlayerEndReached, 
-            self.setCallCompleted) #  _currConvo, 
-        media = self.vlcInstance.media_new_path("/home/piswitch/Apps/sb-audio/" + 
-            conversations[_currConvo]["convoFile"] + ".mp3")
-        self.vlcPlayer.set_media(media)
-        self.vlcPlayer.play()
-        self.displayCaptionSignal.emit('convo', conversations[_currConvo]["convoFile"])
-
-    def playWrongNum(self, pluggedPersonIdx): # , lineIndex
-        print(f"got to play wrong number, currConvo: {self.currConvo}")
-        # Long VLC way of creating callback
-        self.toneEvents.event_attach(vlc.EventType.MediaPlayerEndReached, 
-            self.playFullWrongNum, pluggedPersonIdx) # playFullConvo(currConvo, lineIndex)
-        self.tonePlayer.set_media(self.toneMedia)
-        self.tonePlayer.play()
-
-    def playFullWrongNum(self, event, pluggedPersonIdx): # , lineIndex
+        print(f" -- got to play convo, line {line.lineIdx} convo: {line.convoIdx}")
+        # Ring tone, then the conversation when it ends. The convo is
+        # opened under the tone so the handoff is only a resume
+        self.audio.preroll(line.voice, conversations[line.convoIdx]["convoFile"])
+        self.audio.play(line.tone, "outgoing-ring", self.playFullConvo, line)
+
+    def playFullConvo(self, line):
+        print(f" -- PlayFullConvo {line.convoIdx}, line {line.lineIdx}")
+        # Call is complete when the convo track finishes
+        self.audio.play(line.voice, conversations[line.convoIdx]["convoFile"],
+                        self.setCallCompleted, line)
+        self.showCaption(line, 'convo', conversations[line.convoIdx]["convoFile"])
+
+    def playWrongNum(self, line, pluggedPersonIdx):
+        print(f"got to play wrong number, line {line.lineIdx} convo: {line.convoIdx}")
+        self.audio.preroll(line.voice, persons[pluggedPersonIdx]["wrongNumFile"])
+        self.audio.play(line.tone, "outgoing-ring", self.playFullWrongNum,
+                        line, pluggedPersonIdx)
+
+    def playFullWrongNum(self, line, pluggedPersonIdx):
         # wrongNumFile = persons[pluggedPersonIdx]["wrongNumFile"]
-        # disable event
-        print("  - About to detacth toneEventin playFullWrongNum")
-
-        self.toneEvents.event_detach(vlc.EventType.MediaPlayerEndReached) 
-
         self.displayTextSignal.emit(persons[pluggedPersonIdx]["wrongNumText"])
 
         print(f"  -- Play Wrong Num person {pluggedPersonIdx}")
-        # Set callback for wrongNUm track finish
-
-        self.vlcEvent.event_attach(vlc.EventType.MediaPlayerEndReached, 
-            self.startPlayRequestCorrect) #  _currConvo, 
-        
-        media = self.vlcInstance.media_new_path("/home/piswitch/Apps/sb-audio/" + 
-            persons[pluggedPersonIdx]["wrongNumFile"] + ".mp3")
-        self.vlcPlayer.set_media(media)
-        self.vlcPlayer.play()
-
-
-    def startPlayRequestCorrect(self, event): # , lineIndex
-        print("  - About to detach vlcEvent in startPlayRequestCorrect")
-
-        self.vlcEvent.event_detach(vlc.EventType.MediaPlayerEndReached)
-
-        # self.requestCorrectLine = lineIndex
-        self.playRequestCorrectSignal.emit()
-        # self.requestCorrectTimer.start(1000)
-
-    # def startRequestCorrectTimer(self):
-    #     self.requestCorrectTimer.start(500)
+        # Caller asks again for the right person when wrong num finishes
+        self.audio.play(line.voice, persons[pluggedPersonIdx]["wrongNumFile"],
+                        self.playRequestCorrect, line)
+        self.audio.preroll(line.retry, conversations[line.convoIdx]["retryAfterWrongFile"])
 
     # Reply from caller saying who caller really wants
-    def playRequestCorrect(self):
-        print(f"  - got to playRequestCorrect, currConvo: {self.currConvo}")
+    def playRequestCorrect(self, line):
+        print(f"  - got to playRequestCorrect, line {line.lineIdx} convo: {line.convoIdx}")
         # Transcript for correction
-        self.displayTextSignal.emit(conversations[self.currConvo]["retryAfterWrongText"])
-
-        print("  - About to detach vlcEvent in PlayRequestCorrect")
-        self.vlcEvent.event_detach(vlc.EventType.MediaPlayerEndReached) 
-        media = self.vlcInstance.media_new_path("/home/piswitch/Apps/sb-audio/" + 
-            conversations[self.currConvo]["retryAfterWrongFile"] + ".mp3")
-        
-        self.vlcPlayer.set_media(media)
-        self.vlcPlayer.play()
+        self.displayTextSignal.emit(conversations[line.convoIdx]["retryAfterWrongText"])
+
+        self.audio.play(line.retry, conversations[line.convoIdx]["retryAfterWrongFile"])
         # At this point we hope user unplugs wrong number
         # Will be handled by "unPlug"
 
     def playFinished(self):
-        self.toneEvents.event_detach(vlc.EventType.MediaPlayerEndReached)         
         self.displayTextSignal.emit("Congratulations -- you finished your first shift as a switchboard operator!")
-        # print(f"-- PlayFullConvo {_currConvo}, lineIndex: {lineIndex}")
-        media = self.vlcInstance.media_new_path("/home/piswitch/Apps/sb-audio/" + 
-            "FinishedActivity.mp3")
-        self.vlcEvent.event_detach(vlc.EventType.MediaPlayerEndReached)
-        self.vlcPlayer.set_media(media)
-        self.vlcEvent.event_attach(vlc.EventType.MediaPlayerEndReached, 
-            self.restartOnEndTimeout) 
-        self.vlcPlayer.play()
-
-    def setTimeReCall(self, _currConvo): 
-        print("got to setTimeReCall")
-        # currConvo is already global
-        self.reconnectTimer.start(1000)
-        # recconectTimer will call reCall
-
-    def reCall(self):
-        print("got to reCall")
-        # Hack: receives reCallLine globally 
-        self.playHello(self.currConvo) #, self.reCallLine
-        # calling playHello direclty with callback would send event param
-
-    def handlePlugIn(self, personIdx):
-        """triggered by control.py
+        self.audio.play(self.lines[0].voice, "FinishedActivity", self.restartOnEndTimeout)
+
+    def setTimeReCall(self, line):
+        print(f"got to setTimeReCall, line {line.lineIdx}")
+        scheduler.callLater(1000, self.playHello, line, name=f"reconnect{line.lineIdx}")
+
+    def handlePlugIn(self, personIdx, lineIdx=0):
+        """triggered by control.py, with the line whose cord was plugged
         """
-        print(f' - Start handlePlugIn, personIdx: {personIdx}'
-              f' is caller plugged: {self.phoneLine["caller"]["isPlugged"]}')
+        trace.mark(personIdx, "handlePlugIn")
+        line = self.lines[lineIdx]
+        print(f' - Start handlePlugIn, personIdx: {personIdx} on line {lineIdx}'
+              f' is caller plugged: {line.callerPlugged}')
         #********
         # Other end of the line -- caller is plugged, so this must be the callee
         #********/        
-        if (self.phoneLine["caller"]["isPlugged"]): 
+        if (line.callerPlugged): 
             # caller is plugged
 			# Ignore the following if this is an operator-only call in progress
-            print(' -- else caller plugged. unPlugStatus: ' + str(self.phoneLine["unPlugStatus"]))
-            if (not self.phoneLine["unPlugStatus"] == self.OP_ONLY_IN_PROGRESS):
+            print(' -- else caller plugged. unPlugStatus: ' + str(line.unPlugStatus))
+            if (not line.unPlugStatus == OP_ONLY_IN_PROGRESS):
                 # Whether or not this is correct callee -- turn LED on.
                 self.setLEDSignal.emit(personIdx, True)
-                # Set pinsIn True
-                self.setPinIn(personIdx, True)
+                # Mark the jack in use
+                board.setInUse(personIdx, True)
                 # Stop the hello operator track,  whether this is the correct
                 # callee or not
-                self.vlcPlayer.stop()
+                self.stopVoice(line)
                 # Also stop captions
                 self.stopCaptionSignal.emit()
                 # Set callee -- used by unPlug even if it's the wrong number
-                self.phoneLine["callee"]["index"] = personIdx
-                if (personIdx == self.currCalleeIndex): # Correct callee
+                line.calleeIdx = personIdx
+                line.tracePin = personIdx
+                board.addToLine(lineIdx, personIdx)
+                if (personIdx == conversations[line.convoIdx]["callee"]["index"]): # Correct callee
                     print(f" - Plugged into correct callee, idx: {personIdx}")
                     # Set this line as engaged
-                    self.phoneLine["isEngaged"] = True
+                    line.isEngaged = True
                     # Also set line callee plugged
-                    self.phoneLine["callee"]["isPlugged"] = True
-                    # # Silence incoming Hello/Request, if necessary
-                    # self.vlcPlayers[lineIdx].stop()
-                    self.playConvo(self.currConvo)
+                    line.calleePlugged = True
+                    self.playConvo(line)
                 else: # Wrong number
                     print("wrong number")
-                    self.phoneLine["unPlugStatus"] = self.WRONG_NUM_IN_PROGRESS
-                    self.playWrongNum(personIdx) 
+                    line.unPlugStatus = WRONG_NUM_IN_PROGRESS
+                    self.playWrongNum(line, personIdx) 
             else:
                 print("got to Tressa erroneous plug-in")         
         # ********
@@ -346,221 +331,235 @@ class Model(qtc.QObject):
                 # Turn this LED on
                 self.setLEDSignal.emit(personIdx, True)
                 # Set this person's jack to plugged
-                self.setPinIn(personIdx, True)
+                board.setInUse(personIdx, True)
                 # Set this line as having caller plugged
-                self.phoneLine["caller"]["isPlugged"] = True
-                # Set identity of caller on this line
-                self.phoneLine["caller"]["index"] = personIdx;				
-                # print(f' - Just set caller {self.phoneLine["caller"]["index"]} to True')
-                self.buzzPlayer.stop()
+                line.callerPlugged = True
+                # Set identity of caller on this line, and the call it carries
+                line.callerIdx = personIdx
+                line.convoIdx = self.currConvo
+                line.tracePin = personIdx
+                board.addToLine(lineIdx, personIdx)
+                # Answered -- the buzzer's timeout no longer applies
+                self.audio.stop("buzzer")
+                trace.mark(personIdx, "buzzerStopped")
                 # Blinker handdled in control.py
                 self.blinkerStop.emit()
+                self.duckOtherLines(line)
                 #  Handle case where caller was unplugged
-                if (self.phoneLine["unPlugStatus"] == self.CALLER_UNPLUGGED):
+                if (line.unPlugStatus == CALLER_UNPLUGGED):
                     print(f"  - Caller was unplugged")
-                    """ more logic here  
-                    """
-                    if (self.phoneLine["callee"]["isPlugged"] == True):
-                        # if (correct callee??)
+                    if (line.calleePlugged):
                         # Stop Hello/Request
-                        self.vlcPlayer.stop()
+                        self.stopVoice(line)
                         # set line engaged
-                        self.phoneLine["unPlugStatus"] = self.NO_UNPLUG_STATUS
-                        self.phoneLine["isEngaged"] = True
-                        self.phoneLine["caller"]["isPlugged"] = True
+                        line.unPlugStatus = NO_UNPLUG_STATUS
+                        line.isEngaged = True
                         # Start conversation without the ring
-                        print("  - playFullConvo w/o event ")
-                        # None param is for non-existant event
-                        self.playFullConvo(None, self.currConvo)
+                        print("  - playFullConvo w/o ring ")
+                        self.playFullConvo(line)
                     else:
                         print('   We should not get here');
                 else: # Regular, just play incoming Hello/Request
-                    self.playHello(self.currConvo) 
+                    self.playHello(line) 
             else:
                 print("wrong jack -- or wrong line")
                 self.displayTextSignal.emit("That's not the jack for the person who is asking you to connect!")
 
     def handleUnPlug(self, personIdx): 
-        """ triggered by control.py
+        """ triggered by control.py. The line is the one the jack is on
         """
-        print( f" - Index {personIdx} Unplugged with line status of: {self.phoneLine['unPlugStatus']}\n"
-               f"     while line isEngaged = {self.phoneLine['isEngaged']}"
-            )
+        trace.mark(personIdx, "handleUnPlug")
+        lineIdx = board.lineOf(personIdx)
+        line = self.lines[lineIdx] if lineIdx >= 0 else None
+        print(f" - Index {personIdx} Unplugged from {line}")
         # if not during restart!
+        nowMs = time.monotonic() * 1000
+        self.dualUnplug.noteUnplug(personIdx, nowMs)
+
+        # ---- Second end of a call being unplugged ---
+        if (self.dualUnplug.isPendingFor(personIdx)):
+            print(f'  - other end unplugged too, person id: {persons[personIdx]["name"]}')
+            first = self.dualUnplug.resolveDual(personIdx, nowMs)
+            scheduler.cancel(f"dualUnplug{first.lineIdx}")
+            self.continueDualEngagedUnplug(self.lines[first.lineIdx], first.stopTime)
+
+        elif (line is None):
+            print(" * nothing going on, just unplugging ")
 
         # ---- Conversation in progress --- 
-        if (self.phoneLine["isEngaged"]):
+        elif (line.isEngaged):
             # If conversation is in progress -- engaged (implies correct callee)
             print(f'  - Unplugging a call in progress person id: {persons[personIdx]["name"]} ' )
             # Get stop time
-            stopTime = self.vlcPlayer.get_time()
-            # print(f'  -- stop time: {stopTime}')
+            stopTime = self.getVoiceTime(line)
 
-            # Stop the audio
-            self.vlcPlayer.stop()
+            # Stop the audio -- and with it the call-completed callback
+            self.stopVoice(line)
             # Stop subtitles
             self.stopCaptionSignal.emit()
             # Clear Transcript 
             self.displayTextSignal.emit("Call disconnected..")
 
-            # Check to see if Both were unplugged
-            # Maybe look at pinsIn -- if only one was unplugged then the other 
-            # pin should be in. Be aware of the 150 finishCheck timeer -- 
-            # Do my business here within that time 
-            # And don't forget to check enough time to decide whether to start 
-            # over or continue.
-            # if
-
-            self.currPersonIdx = personIdx
-            self.currStopTime = stopTime
-            print(' - got to engaged unplug, calling check dual')
-            # Can't call timer directly, so setting temp variables
-            # and starting timer with this signal
-            self.checkDualUnplugSignal.emit(90)
-            
-            # continueSingleEngagedUnplug could come back here
-            # if I handle dual unplug in control.py
+            # Was it one plug or both? Wait for the other end of the call,
+            # but only if it is still in
+            otherMask = board.lineMask(lineIdx) & board.plugged & ~(1 << personIdx)
+            if (otherMask):
+                otherIdx = otherMask.bit_length() - 1
+                self.dualUnplug.begin(lineIdx, personIdx, otherIdx, stopTime, nowMs)
+                print(f' - got to engaged unplug, waiting up to '
+                      f'{self.dualUnplug.windowMs} ms for {otherIdx}')
+                scheduler.callLater(self.dualUnplug.windowMs, self.checkDualUnplug,
+                                    otherIdx, name=f"dualUnplug{lineIdx}")
+            else:
+                self.continueSingleEngagedUnplug(line, personIdx, stopTime)
 
         # ---- Conversation NOT in progress --- 
         else:   
             # Phone line is not engaged -- isEngaged == False
-            print(f' - not engaged, callee index: {self.phoneLine["callee"]["index"]}'
-                  f'    caller index: {self.phoneLine["caller"]["index"]}')
-            # If wrong number, hmm need plug status for wrong number
+            print(f' - not engaged, callee index: {line.calleeIdx}'
+                  f'    caller index: {line.callerIdx}')
 
             # # First, maybe this is an unplug of "old" call to free up the plugg
             # # caller would be plugged
-            if (self.phoneLine["caller"]["isPlugged"] == True):
+            if (line.callerPlugged):
                 # Caller has initiated a call
 
                 # If this is the caller being unplugged (erroneously or early)
                 # Correct caller unplugging?
-                if (personIdx == self.phoneLine["caller"]["index"]):
+                if (personIdx == line.callerIdx):
                     print("     caller unplugged")
-                    stopTime = self.vlcPlayer.get_time()
-                    self.vlcPlayer.stop() 
+                    stopTime = self.getVoiceTime(line)
+                    self.stopVoice(line)
                     #  LED handled by either condition below
                     # If this is a hello only call # And if we're close enough to the end
-                    if ((self.currConvo == 3 or  self.currConvo == 8) and
-                        stopTime > conversations[self.currConvo]["okTimeHello"]):
+                    if (isOperatorOnly(line.convoIdx) and
+                        stopTime > conversations[line.convoIdx]["okTimeHello"]):
                         # Close enough to end, move on 
                         print(f'  - stopped operator only caller with time: {stopTime}')
-                        self.endOperatorOnlyHello(None)
+                        self.endOperatorOnlyHello(line)
                     else:
-                        self.clearTheLine()
-                        self.callInitTimer.start(1000)
-                elif (self.phoneLine["unPlugStatus"] == self.WRONG_NUM_IN_PROGRESS):
+                        self.clearTheLine(line)
+                        scheduler.callLater(1000, self.initiateCall, name="callInit")
+                elif (line.unPlugStatus == WRONG_NUM_IN_PROGRESS):
                     # Unplugging wrong num
                     print(f'  Unplug on wrong number, personIdx: {personIdx}')
-                    self.vlcPlayer.stop() 
-                    # Cover for before personidx defined
-                    if (personIdx < 99):
-                        self.setLEDSignal.emit(personIdx, False)
+                    # Also drops the pending request-correct
+                    self.stopVoice(line)
+                    self.setLEDSignal.emit(personIdx, False)
+                    board.removeFromLine(lineIdx, personIdx)
                     # clear the unplug status
-                    self.phoneLine["unPlugStatus"] = self.NO_UNPLUG_STATUS
+                    line.unPlugStatus = NO_UNPLUG_STATUS
                 else: # Not unplugging wrong - do nothing
                     print(" just unplugging to free up a plug")
 
             else: # caller not plugged
                 print(" * nothing going on, just unplugging ")
 
-        # After all is said and done, this was unplugged, So, set pinIn False
-        # self.setPinInLine(personIdx, -1)
-        self.setPinIn(personIdx, False)
-        print(f" - pin {personIdx} is now {self.pinsIn[personIdx]}")
-
-    # def setDualUnplugTimer(self):
-    #     # Timer will call 
-    #     self.dualUnplugTimer.start(90)
-
-    def checkDualUnplug(self):
-        print(' - got to checkDualUnplug, need to actually check!')
-        # if such & so do somethingelse
-        self.continueSingleEngagedUnplug(self.currPersonIdx, self.currStopTime)
+        # After all is said and done, this was unplugged, so not in use
+        board.setInUse(personIdx, False)
+        print(f" - pin {personIdx} is now in use: {board.isInUse(personIdx)}")
+        # An unplug has no audio to wait for
+        trace.finish(personIdx)
+
+    def checkDualUnplug(self, otherIdx):
+        """Window is up without the other end's unplug."""
+        pending = self.dualUnplug.get(otherIdx)
+        if (pending is None):
+            return
+        if (board.unsettled & (1 << otherIdx) and not pending.extended):
+            # Other plug is already on its way out, let it settle
+            pending.extended = True
+            scheduler.callLater(UNPLUG_STABLE_MS, self.checkDualUnplug, otherIdx,
+                                name=f"dualUnplug{pending.lineIdx}")
+            return
+        self.dualUnplug.resolveSingle(otherIdx, time.monotonic() * 1000)
+        print(f' - single unplug. {self.dualUnplug.report()}')
+        self.continueSingleEngagedUnplug(self.lines[pending.lineIdx], pending.firstIdx,
+                                         pending.stopTime)
+
+    def continueDualEngagedUnplug(self, line, stopTime):
+        # Both caller and callee unplugged
+        print(f'   Both ends unplugged. stopTime: {stopTime}. {self.dualUnplug.report()}')
+        if (stopTime >= conversations[line.convoIdx]["okTimeConvo"]):
+            # Late in call -- same as hanging up at the end
+            self.setCallCompleted(line)
+        else:
+            # Early -- nobody left on the line, ring this call again
+            self.clearTheLine(line)
+            scheduler.callLater(1000, self.initiateCall, name="callInit")
 
-    def continueSingleEngagedUnplug(self, personIdx, stopTime):
-        # print(' - got to continue single unplug')
+    def continueSingleEngagedUnplug(self, line, personIdx, stopTime):
         # callee just unplugged
-        if (self.phoneLine["callee"]["index"] == personIdx):  
+        if (line.calleeIdx == personIdx):  
             print('   Unplugging callee. stopTime: ' + str(stopTime))
             # Turn off callee LED
-            self.setLEDSignal.emit(self.phoneLine["callee"]["index"], False)
+            self.setLEDSignal.emit(line.calleeIdx, False)
+            board.removeFromLine(line.lineIdx, personIdx)
 
             # If Early in call, retry
-            if (stopTime < conversations[self.currConvo]["okTimeConvo"]):
+            if (stopTime < conversations[line.convoIdx]["okTimeConvo"]):
                 # Restart this answer to cal
                 # Mark callee unplugged
-                self.phoneLine["callee"]["isPlugged"] = False
-                self.phoneLine["isEngaged"] = False
+                line.calleePlugged = False
+                line.isEngaged = False
                 # stop captions
                 self.stopCaptionSignal.emit()
                 # Leave caller plugged in, replay hello
-                self.setTimeReCall(self.currConvo)
+                self.setTimeReCall(line)
             else:
                 # Late in call -- end convo and move on
                 print(f'  - stopped with time: {stopTime}')
-                self.setCallCompleted(self)
+                self.setCallCompleted(line)
 
         # caller unplugged
-        elif (self.phoneLine["caller"]["index"] == personIdx): 
+        elif (line.callerIdx == personIdx): 
             print(" Caller just unplugged")
-            self.phoneLine["caller"]["isPlugged"] = False
-            self.phoneLine["isEngaged"] = False
+            line.callerPlugged = False
+            line.isEngaged = False
             # Also
-            self.phoneLine["unPlugStatus"] = self.CALLER_UNPLUGGED
+            line.unPlugStatus = CALLER_UNPLUGGED
             # Turn off caller LED
-            self.setLEDSignal.emit(self.phoneLine["caller"]["index"], False)
-            # signal calls callInitTimer which calls initiateCall	
-            self.setTimeToNextSignal.emit(1000)					
+            self.setLEDSignal.emit(line.callerIdx, False)
+            board.removeFromLine(line.lineIdx, personIdx)
+            scheduler.callLater(1000, self.initiateCall, name="callInit")
         else: 
             print('    This should not happen')
 
-    def setCallCompleted(self, event=None): #, _currConvo, lineIndex
-        # Disable callback if present
-        if (event != None):
-            self.vlcEvent.event_detach(vlc.EventType.MediaPlayerEndReached)
-                
-        print(f" -- setCallCompleted. Convo: {self.currConvo}")
+    def setCallCompleted(self, line):
+        # Reached once per call: either the convo track ended or it was
+        # unplugged late, and unplugging stops the track's end callback
+        print(f" -- setCallCompleted. Convo: {line.convoIdx}, line {line.lineIdx}")
         # Stop call
-        self.stopCall()
-
-        # # print("other line has neither caller nor callee plugged")
-        # if (self.phoneLines[otherLineIdx]["unPlugStatus"] == self.REPLUG_IN_PROGRESS):
-
-        # Workaround to stop double calling
-        if not self.incrementJustCalled:
-            self.incrementJustCalled = True
-            print(f' -  increment from {self.currConvo} and start regular timer for next call.')
-            # Uptick currConvo here, when call is comlete
-            self.currConvo += 1
-            # Use signal rather than calling callInitTimer bcz threads
-            self.setTimeToNextSignal.emit(1000)
-
-        # When call 0 ends, do nothing. But how do I kmow this is is 0 ending since
-        # currConvo has already been incremented to 1. When 1 ends I do want to increment.    
-        
-        # if (self.interruptingCallInHasBeenInitiated):
-        #     print("-- Interrupting call has been initiated -- and is ending, do nothing.")    
-
-    def stopCall(self): # , lineIndex
-        self.clearTheLine()
-        # Reset volume -- in this line was silenced by interrupting call
-        # self.vlcPlayers[self.prevLineInUse].audio_set_volume(100)
-
-    def clearTheLine(self):
+        self.stopCall(line)
+
+        print(f' -  increment from {line.convoIdx} and start regular timer for next call.')
+        # Uptick currConvo here, when call is comlete
+        self.currConvo = line.convoIdx + 1
+        scheduler.callLater(1000, self.initiateCall, name="callInit")
+
+    def stopCall(self, line):
+        self.clearTheLine(line)
+
+    def clearTheLine(self, line):
         # Clear the line settings
-        self.phoneLine["caller"]["isPlugged"] = False
-        self.phoneLine["callee"]["isPlugged"] = False
-        self.phoneLine["isEngaged"] = False
-        self.phoneLine["unPlugStatus"] = self.NO_UNPLUG_STATUS
-        # self.prevLineInUse = -1
-        # Turn off the LEDs
-        self.setLEDSignal.emit(self.phoneLine["caller"]["index"], False)
-        # Can't turn off callee led if callee index hasn't been defined
-        # print(f'About to try to turn off .callee.index: {self.phoneLines[lineIdx]["callee"]["index"]}')
-        if (self.phoneLine["callee"]["index"] < 90):
-            # console.log('got into callee index not null');
-            self.setLEDSignal.emit(self.phoneLine["callee"]["index"], False)
+        line.clear()
+        # Turn off the LEDs of whoever is on the line, as one mask
+        self.setLEDMaskSignal.emit(board.clearLine(line.lineIdx), False)
+        self.unduckOtherLines(line)
+
+    def duckOtherLines(self, line):
+        # A newly answered call would talk over any call already going on
+        # another line, which carries on underneath. Calls still ring one
+        # at a time, so no other line is engaged when this runs and nothing
+        # is ducked -- this is the hook for when calls overlap
+        for other in self.lines:
+            if other is not line and other.isEngaged:
+                self.audio.duck(other.voice)
+
+    def unduckOtherLines(self, line):
+        for other in self.lines:
+            if other is not line:
+                self.audio.unduck(other.voice)
 
     def handleStart(self):
         """Just for startup
@@ -570,36 +569,21 @@ class Model(qtc.QObject):
 
 
         print(f" -- Playing Welcome")
-        # Set callback for welcome track finish
-        self.vlcEvent.event_attach(vlc.EventType.MediaPlayerEndReached, 
-            self.afterWelcome)  
-        media = self.vlcInstance.media_new_path("/home/piswitch/Apps/sb-audio/Welcome.mp3")
-        self.vlcPlayer.set_media(media)
-        self.vlcPlayer.play()
-        # self.displayCaptionSignal.emit('convo', conversations[_currConvo]["convoFile"])
+        # First call comes in after the welcome track
+        self.audio.play(self.lines[0].voice, "Welcome", self.afterWelcome)
         self.displayTextSignal.emit("Welcome to the switchboard game. \nIt's your turn to be a switchboard operator! \nHere comes the first call.")
 
-    def afterWelcome(self, event):
-        self.setTimeToNextSignal.emit(1000) # calls setTimeToNext
+    def afterWelcome(self):
+        scheduler.callLater(1000, self.initiateCall, name="callInit")
 
-    def restartOnTimeout(self, event):
+    def restartOnTimeout(self):
         print(' - auto starting reset')
-        self.buzzEvents.event_detach(vlc.EventType.MediaPlayerEndReached)
         self.blinkerStop.emit()
         self.startResetSignal.emit()
 
-    def restartOnEndTimeout(self, event):
+    def restartOnEndTimeout(self):
         print(' - Starting reset after End')
-        self.vlcEvent.event_detach(vlc.EventType.MediaPlayerEndReached)
-
-        # Can't call endTimer directly, so signal
-        # This signal will call startEndTimer
-        self.setTimeToEndSignal.emit()
-        # Couldn't use setTimeToNextSignal because that's hard-wired to starting calls
-
-    def startEndTimer(self):
-        # Timer will call self.startResetSignal.emit()
-        self.resetEndTimer.start(2000)
+        scheduler.callLater(2000, self.resetAtEnd, name="resetEnd")
 
     def resetAtEnd(self):
         # Maybe this could go directly in callback?
@@ -0,0 +1,433 @@
+"""Audio backend that plays from memory instead of through libVLC.
+
+Every clip is decoded once at startup into mono 16-bit PCM -- from a .wav
+of the same name next to the .mp3 if there is one, else through ffmpeg --
+and one mixer thread sums the active players into a sink, BLOCK_FRAMES at
+a time:
+  - alsa:        aplay reading raw PCM from a pipe
+  - null:        throws the audio away, paced to real time
+  - wav:<path>:  writes the mix to a .wav file, paced to real time
+so the game, and the audio benchmarks, run headless on any Linux box.
+
+Every player has a gain (Q15 fixed point, so scaling is integer work).
+setGain/duck/unduck move it along a short ramp that starts at an exact
+sample of the clip -- the next one the mixer plays, or atMs -- so a line
+can be ducked under another without clicks. Players share the decoded
+clips; scaling and summing go through map/zip in C rather than a Python
+loop per sample, and a player at unity gain is only a buffer slice.
+
+Same play/preroll/stop/getTime interface as audio_engine.AudioEngine
+(see audio_backend.py). Player callbacks (onPlaying, the end of a clip)
+come from the mixer thread; ends are handed on to the Qt thread.
+"""
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+import wave
+from array import array
+from itertools import repeat, zip_longest
+from operator import mul, rshift
+
+from audio_backend import PlaybackTracker, RAMP_MS
+from content_bundle import AUDIO_DIR, contentClipNames
+
+SAMPLE_RATE = 44100
+# ~12 ms at 44.1 kHz -- the most a play() waits for the mixer
+BLOCK_FRAMES = 512
+# Gains are ints, UNITY == 1.0
+GAIN_BITS = 15
+UNITY = 1 << GAIN_BITS
+
+
+class PcmClip:
+    __slots__ = ("key", "samples", "rate")
+
+    def __init__(self, key, samples, rate):
+        self.key = key
+        self.samples = samples
+        self.rate = rate
+
+    @property
+    def durationMs(self):
+        return len(self.samples) * 1000 // self.rate
+
+
+def _readWav(path, rate):
+    with wave.open(path, 'rb') as f:
+        if (f.getsampwidth() != 2 or f.getnchannels() != 1 or
+                f.getframerate() != rate):
+            return None
+        samples = array('h')
+        samples.frombytes(f.readframes(f.getnframes()))
+    if sys.byteorder != 'little':
+        samples.byteswap()
+    return samples
+
+
+def decodeClip(path, rate=SAMPLE_RATE):
+    """Mono s16 samples for an audio file, or None if it can't be read."""
+    wavPath = os.path.splitext(path)[0] + '.wav'
+    if os.path.exists(wavPath):
+        samples = _readWav(wavPath, rate)
+        if samples is not None:
+            return samples
+    if not os.path.exists(path) or shutil.which('ffmpeg') is None:
+        return None
+    result = subprocess.run(
+        ['ffmpeg', '-v', 'error', '-i', path,
+         '-f', 's16le', '-ac', '1', '-ar', str(rate), '-'],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        print(f" * ffmpeg could not decode {path}: {result.stderr.decode().strip()}")
+        return None
+    samples = array('h')
+    samples.frombytes(result.stdout)
+    if sys.byteorder != 'little':
+        samples.byteswap()
+    return samples
+
+
+class PcmRegistry:
+    """Same keys and calls as media_cache.MediaRegistry, holding decoded
+    clips instead of VLC Media.
+    """
+    def __init__(self, audioDir=AUDIO_DIR, rate=SAMPLE_RATE):
+        self.audioDir = audioDir
+        self.rate = rate
+        self.media = {}
+        self.missing = []
+        self.decodeSeconds = 0.0
+
+    def add(self, key):
+        path = os.path.join(self.audioDir, key + ".mp3")
+        startTime = time.perf_counter()
+        samples = decodeClip(path, self.rate)
+        self.decodeSeconds += time.perf_counter() - startTime
+        if samples is None:
+            self.missing.append(key)
+            print(f" * missing audio file: {path}")
+            # Plays as an immediate end, like a bad file in VLC
+            samples = array('h')
+        clip = self.media[key] = PcmClip(key, samples, self.rate)
+        return clip
+
+    def addContent(self, conversations, persons):
+        for key in contentClipNames(conversations, persons):
+            if key not in self.media:
+                self.add(key)
+        totalBytes = sum(len(clip.samples) * 2 for clip in self.media.values())
+        print(f" * decoded {len(self.media)} clips, {totalBytes / 1e6:.1f} MB, "
+              f"in {self.decodeSeconds:.1f} s")
+
+    def get(self, key):
+        clip = self.media.get(key)
+        if clip is None:
+            clip = self.add(key)
+        return clip
+
+    def release(self, key):
+        self.media.pop(key, None)
+
+    def releaseAll(self):
+        self.media.clear()
+
+
+class NullSink:
+    """Discards the audio. paced: take as long as playing it would."""
+    def __init__(self, rate=SAMPLE_RATE, paced=True):
+        self.rate = rate
+        self.paced = paced
+        self.nextDue = None
+
+    def _pace(self, data):
+        if not self.paced:
+            return
+        now = time.monotonic()
+        if self.nextDue is None or self.nextDue < now:
+            self.nextDue = now
+        self.nextDue += len(data) / 2 / self.rate
+        time.sleep(max(0, self.nextDue - now))
+
+    def write(self, data):
+        self._pace(data)
+
+    def close(self):
+        pass
+
+
+class WavSink(NullSink):
+    def __init__(self, path, rate=SAMPLE_RATE, paced=True):
+        super().__init__(rate, paced)
+        self.file = wave.open(path, 'wb')
+        self.file.setnchannels(1)
+        self.file.setsampwidth(2)
+        self.file.setframerate(rate)
+
+    def write(self, data):
+        self.file.writeframes(data)
+        self._pace(data)
+
+    def close(self):
+        self.file.close()
+
+
+class AlsaSink:
+    """Raw PCM into aplay, whose pipe blocks at the device's pace."""
+    def __init__(self, rate=SAMPLE_RATE, bufferUs=50000):
+        self.process = subprocess.Popen(
+            ['aplay', '-q', '-t', 'raw', '-f', 'S16_LE', '-c', '1', '-r', str(rate),
+             f'--buffer-time={bufferUs}'],
+            stdin=subprocess.PIPE)
+
+    def write(self, data):
+        self.process.stdin.write(data)
+        self.process.stdin.flush()
+
+    def close(self):
+        self.process.stdin.close()
+        self.process.wait()
+
+
+def openSink(spec, rate=SAMPLE_RATE):
+    """alsa, null or wav:<path>"""
+    if spec == "alsa":
+        return AlsaSink(rate)
+    if spec == "null":
+        return NullSink(rate)
+    if spec.startswith("wav:"):
+        return WavSink(spec[4:], rate)
+    raise ValueError(f"unknown audio sink: {spec}")
+
+
+def toGain(gain):
+    """Float gain (1.0 is as recorded) to a Q15 int, 0 to UNITY."""
+    return max(0, min(UNITY, int(round(gain * UNITY))))
+
+
+def scaleBlock(block, gains):
+    """block * gains, gains a Q15 int or a Q15 int per sample."""
+    if gains == UNITY:
+        return block
+    if isinstance(gains, int):
+        gains = repeat(gains)
+    return array('h', map(rshift, map(mul, block, gains), repeat(GAIN_BITS)))
+
+
+def mixBlocks(blocks, frames=BLOCK_FRAMES):
+    """Sum sample blocks with clipping, padded with silence to frames."""
+    if not blocks:
+        return bytes(frames * 2)
+    if len(blocks) == 1:
+        mixed = blocks[0]
+    else:
+        sums = list(map(sum, zip_longest(*blocks, fillvalue=0)))
+        if max(sums) > 32767 or min(sums) < -32768:
+            sums = map(min, map(max, sums, repeat(-32768)), repeat(32767))
+        mixed = array('h', sums)
+    data = mixed.tobytes()
+    return data + bytes(frames * 2 - len(data))
+
+
+class GainRamp:
+    """Linear move from fromGain to toGain over clip samples
+    [startSample, endSample).
+    """
+    __slots__ = ("startSample", "endSample", "fromGain", "toGain")
+
+    def __init__(self, startSample, frames, fromGain, toGain):
+        self.startSample = startSample
+        self.endSample = startSample + max(1, frames)
+        self.fromGain = fromGain
+        self.toGain = toGain
+
+    def gainAt(self, sample):
+        if sample < self.startSample:
+            return self.fromGain
+        if sample >= self.endSample:
+            return self.toGain
+        return self.fromGain + ((self.toGain - self.fromGain) *
+                                (sample - self.startSample) //
+                                (self.endSample - self.startSample))
+
+
+class PcmPlayer:
+    __slots__ = ("name", "clip", "pos", "paused", "startReported", "onPlaying",
+                 "gain", "ramp")
+
+    def __init__(self, name):
+        self.name = name
+        self.clip = None
+        self.pos = 0
+        self.paused = False
+        self.startReported = True
+        self.onPlaying = []
+        # Kept from clip to clip -- a ducked line stays ducked
+        self.gain = UNITY
+        self.ramp = None
+
+    def load(self, clip, paused):
+        self.clip = clip
+        self.pos = 0
+        self.paused = paused
+        self.startReported = False
+        # A ramp is in the old clip's samples, so land on where it was going
+        self.settleRamp()
+
+    def settleRamp(self):
+        if self.ramp is not None:
+            self.gain = self.ramp.toGain
+            self.ramp = None
+
+    def setGain(self, gain, startSample, frames):
+        # From whatever the gain will be at startSample
+        self.ramp = GainRamp(startSample, frames, self.gainAt(startSample), gain)
+
+    def gainAt(self, sample):
+        return self.gain if self.ramp is None else self.ramp.gainAt(sample)
+
+    def blockGains(self, frames):
+        """The gain for the next frames samples: one int, or one per
+        sample while a ramp is under way.
+        """
+        ramp = self.ramp
+        if ramp is None:
+            return self.gain
+        start, end = self.pos, self.pos + frames
+        if end <= ramp.startSample:
+            return ramp.fromGain
+        if start >= ramp.endSample:
+            self.gain = ramp.toGain
+            self.ramp = None
+            return self.gain
+        return [ramp.gainAt(sample) for sample in range(start, end)]
+
+
+class PcmAudioEngine(PlaybackTracker):
+    def __init__(self, playerNames, audioDir=AUDIO_DIR, sink=None, rate=SAMPLE_RATE):
+        super().__init__()
+        self.rate = rate
+        self.media = PcmRegistry(audioDir, rate)
+        self.sink = sink if sink is not None else NullSink(rate)
+        # Player state is shared with the mixer thread
+        self.lock = threading.Lock()
+        self.players = {}
+        # Last clip each player played, for play(name, None)
+        self.lastKey = {}
+        for name in playerNames:
+            self.addPlayer(name)
+        self.blocksWritten = 0
+        self.running = True
+        self.mixer = threading.Thread(target=self._mix, name="pcm-mixer", daemon=True)
+        self.mixer.start()
+
+    def addPlayer(self, name):
+        player = self.players[name] = PcmPlayer(name)
+        self.current[name] = None
+        return player
+
+    def play(self, playerName, key, onEnd=None, *args):
+        """Play clip key (None: the last clip on this player) and return
+        its Playback handle.
+        """
+        if key is None:
+            key = self.lastKey.get(playerName)
+        playback = self._newPlayback(playerName, key, onEnd, args)
+        prerolledKey = self.prerolled.pop(playerName, None)
+        clip = None if key == prerolledKey else self.media.get(key)
+        with self.lock:
+            player = self.players[playerName]
+            if clip is None:
+                # Pre-rolled -- already at zero, just let the mixer have it
+                player.paused = False
+            else:
+                player.load(clip, paused=False)
+        self.lastKey[playerName] = key
+        return playback
+
+    def preroll(self, playerName, key):
+        self.stop(playerName)
+        clip = self.media.get(key)
+        with self.lock:
+            self.players[playerName].load(clip, paused=True)
+        self.prerolled[playerName] = key
+
+    def stop(self, playerName):
+        self.cancel(playerName)
+        self.prerolled.pop(playerName, None)
+        with self.lock:
+            self.players[playerName].clip = None
+
+    def stopAll(self):
+        for name in self.players:
+            self.stop(name)
+        with self.lock:
+            for player in self.players.values():
+                player.gain = UNITY
+                player.ramp = None
+
+    def setGain(self, playerName, gain, rampMs=RAMP_MS, atMs=None):
+        """Move the player's gain (1.0 as recorded) to gain over rampMs,
+        starting atMs into the clip, or with the next sample played.
+        """
+        frames = int(rampMs * self.rate / 1000)
+        with self.lock:
+            player = self.players[playerName]
+            startSample = player.pos if atMs is None else int(atMs * self.rate / 1000)
+            player.setGain(toGain(gain), startSample, frames)
+
+    def getTime(self, playerName):
+        with self.lock:
+            player = self.players[playerName]
+            if player.clip is None:
+                return -1
+            return player.pos * 1000 // self.rate
+
+    def _playerEnded(self, playerName):
+        # The mixer drops the clip at its end, play() loads a new one
+        with self.lock:
+            return self.players[playerName].clip is None
+
+    def onPlaying(self, playerName, callback):
+        """callback() from the mixer thread once the first block of a
+        clip has gone to the sink.
+        """
+        self.players[playerName].onPlaying.append(callback)
+
+    def _mix(self):
+        while self.running:
+            blocks = []
+            started = []
+            ended = []
+            with self.lock:
+                for player in self.players.values():
+                    if player.clip is None or player.paused:
+                        continue
+                    samples = player.clip.samples
+                    gains = player.blockGains(BLOCK_FRAMES)
+                    if gains != 0:
+                        blocks.append(scaleBlock(
+                            samples[player.pos:player.pos + BLOCK_FRAMES], gains))
+                    player.pos += BLOCK_FRAMES
+                    if not player.startReported:
+                        player.startReported = True
+                        started.append(player)
+                    if player.pos >= len(samples):
+                        player.clip = None
+                        ended.append(player.name)
+            self.sink.write(mixBlocks(blocks))
+            self.blocksWritten += 1
+            for player in started:
+                for callback in player.onPlaying:
+                    callback()
+            for name in ended:
+                self._endReached(name)
+
+    def release(self):
+        self.stopAll()
+        self.running = False
+        self.mixer.join(timeout=1)
+        self.sink.close()
+        self.media.releaseAll()
@@ -0,0 +1,129 @@
+"""Polled input, for installations where the INT line can't be trusted.
+
+A background thread wakes at a fixed rate and has the i2c worker read the
+whole port (every input chip, see JackArray.read). The read is diffed
+against the previous one and any changed bits are handed on as
+(stamp, changedBits, portBits) -- the same (stamp, intFlag, intCap)
+triple an interrupt capture gives, so control.py runs both through
+drainInterrupts and the debouncer unchanged.
+
+Each poll's bus time and CPU time (bus thread plus poll thread) is kept,
+along with polls that ran past their slot, so report() can be compared
+against the interrupt path's numbers for the same board. A poll whose
+read fails (NAK, OSError) is counted and skipped -- the next one tries
+again, so a flaky bus doesn't stop the input.
+"""
+import threading
+import time
+
+from i2c_worker import PRIORITY_INTERRUPT
+
+DEFAULT_POLL_HZ = 200
+
+
+class PollStats:
+    __slots__ = ("polls", "changes", "overruns", "busTotal", "busMax",
+                 "cpuTotal", "cpuMax", "errors", "lastError")
+
+    def __init__(self):
+        self.polls = 0
+        self.changes = 0
+        self.overruns = 0
+        self.busTotal = 0.0
+        self.busMax = 0.0
+        self.cpuTotal = 0.0
+        self.cpuMax = 0.0
+        self.errors = 0
+        self.lastError = None
+
+    def add(self, busTime, cpuTime, changed):
+        self.polls += 1
+        if changed:
+            self.changes += 1
+        self.busTotal += busTime
+        self.cpuTotal += cpuTime
+        if busTime > self.busMax:
+            self.busMax = busTime
+        if cpuTime > self.cpuMax:
+            self.cpuMax = cpuTime
+
+
+class PortPoller(threading.Thread):
+    def __init__(self, i2cWorker, readBits, onChange, rateHz=DEFAULT_POLL_HZ):
+        """readBits() runs on the i2c thread and returns the port bits.
+        onChange(stamp, changedBits, portBits) is called from the i2c
+        thread too, like captureInterrupt.
+        """
+        super().__init__(name="port-poller", daemon=True)
+        self.i2cWorker = i2cWorker
+        self.readBits = readBits
+        self.onChange = onChange
+        self.interval = 1.0 / rateHz
+        self.rateHz = rateHz
+        self.prevBits = None
+        self.running = True
+        self._statsLock = threading.Lock()
+        self.stats = PollStats()
+        self.startTime = time.monotonic()
+
+    def resetBits(self, bits):
+        """On the i2c thread: take bits as the last poll, e.g. after the
+        chips are reconfigured, so nothing is reported as a change.
+        """
+        self.prevBits = bits
+
+    def stop(self):
+        self.running = False
+
+    def run(self):
+        nextDue = time.monotonic()
+        while self.running:
+            cpuStart = time.thread_time()
+            try:
+                busTime, busCpu, changed = self.i2cWorker.call(PRIORITY_INTERRUPT, self._poll)
+            except Exception as e:
+                with self._statsLock:
+                    if not self.stats.errors:
+                        print(f" * poll failed, carrying on: {e!r}")
+                    self.stats.errors += 1
+                    self.stats.lastError = repr(e)
+            else:
+                cpuTime = time.thread_time() - cpuStart + busCpu
+                with self._statsLock:
+                    self.stats.add(busTime, cpuTime, changed)
+            nextDue += self.interval
+            now = time.monotonic()
+            if now > nextDue:
+                # Slot missed -- start again from now rather than catch up
+                with self._statsLock:
+                    self.stats.overruns += 1
+                nextDue = now
+            else:
+                time.sleep(nextDue - now)
+
+    def _poll(self):
+        # Runs on the i2c thread
+        cpuStart = time.thread_time()
+        stamp = time.monotonic()
+        bits = self.readBits()
+        busTime = time.monotonic() - stamp
+        changedBits = 0 if self.prevBits is None else bits ^ self.prevBits
+        self.prevBits = bits
+        if changedBits:
+            self.onChange(stamp, changedBits, bits)
+        return busTime, time.thread_time() - cpuStart, changedBits != 0
+
+    def report(self):
+        with self._statsLock:
+            stats = self.stats
+            polls = max(1, stats.polls)
+            elapsed = max(1e-9, time.monotonic() - self.startTime)
+            return (f" * polling at {self.rateHz:g} Hz: {stats.polls} polls, "
+                    f"{stats.changes} with changes, {stats.overruns} overran, "
+                    f"{stats.errors} failed"
+                    + (f" (last: {stats.lastError})" if stats.errors else "") + "\n"
+                    f"   bus mean {stats.busTotal * 1000 / polls:.2f} ms "
+                    f"max {stats.busMax * 1000:.2f} ms,"
+                    f" cpu mean {stats.cpuTotal * 1000 / polls:.2f} ms "
+                    f"max {stats.cpuMax * 1000:.2f} ms"
+                    f" ({stats.cpuTotal / elapsed * 100:.1f}% of a core)")
@@ -0,0 +1,127 @@
+"""One timer for the whole app.
+
+Replaces the separate single-shot QTimers (call init, reconnect, reset at
+end, dual unplug, bounce, blink, captions) and the signals that only
+existed because a QTimer can't be started from a VLC thread or pass
+arguments. callLater() takes a callback with arguments, can be called from
+any thread, and the callback always runs on the Qt thread. A name makes
+an entry restartable like a QTimer: scheduling the same name again
+replaces it.
+
+Entries due within COALESCE_MS of each other run on the same wake, and
+pending() shows what is scheduled and when.
+"""
+import heapq
+import itertools
+import threading
+import time
+
+from PyQt5 import QtCore as qtc
+
+COALESCE_MS = 4
+
+
+class TimerEntry:
+    __slots__ = ("deadline", "seq", "name", "fn", "args", "cancelled")
+
+    def __init__(self, deadline, seq, name, fn, args):
+        self.deadline = deadline
+        self.seq = seq
+        self.name = name
+        self.fn = fn
+        self.args = args
+        self.cancelled = False
+
+    def __lt__(self, other):
+        return (self.deadline, self.seq) < (other.deadline, other.seq)
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class Scheduler(qtc.QObject):
+    # Lets other threads get the Qt thread to re-arm the timer
+    _wake = qtc.pyqtSignal()
+
+    def __init__(self, coalesceMs=COALESCE_MS):
+        super().__init__()
+        self.coalesce = coalesceMs / 1000
+        self.lock = threading.Lock()
+        self.heap = []
+        self.named = {}
+        self._sequence = itertools.count()
+        self.wakeups = 0
+        self.timer = qtc.QTimer()
+        self.timer.setSingleShot(True)
+        self.timer.setTimerType(qtc.Qt.PreciseTimer)
+        self.timer.timeout.connect(self._run)
+        self._wake.connect(self._rearm)
+
+    def callLater(self, delayMs, fn, *args, name=None):
+        """Run fn(*args) on the Qt thread after delayMs. Safe from any
+        thread. A named entry replaces a pending one of the same name.
+        """
+        entry = TimerEntry(time.monotonic() + delayMs / 1000, next(self._sequence),
+                           name, fn, args)
+        with self.lock:
+            if name is not None:
+                previous = self.named.get(name)
+                if previous is not None:
+                    previous.cancel()
+                self.named[name] = entry
+            heapq.heappush(self.heap, entry)
+        # Direct call on the Qt thread, queued to it from anywhere else
+        self._wake.emit()
+        return entry
+
+    def callSoon(self, fn, *args, name=None):
+        return self.callLater(0, fn, *args, name=name)
+
+    def cancel(self, name):
+        with self.lock:
+            entry = self.named.pop(name, None)
+            if entry is not None:
+                entry.cancel()
+
+    def isPending(self, name):
+        with self.lock:
+            return name in self.named
+
+    def pending(self):
+        """[(name or function name, ms until due)], soonest first."""
+        now = time.monotonic()
+        with self.lock:
+            return [(entry.name or entry.fn.__name__, (entry.deadline - now) * 1000)
+                    for entry in sorted(self.heap) if not entry.cancelled]
+
+    def _rearm(self):
+        with self.lock:
+            while self.heap and self.heap[0].cancelled:
+                heapq.heappop(self.heap)
+            if not self.heap:
+                self.timer.stop()
+                return
+            delay = self.heap[0].deadline - time.monotonic()
+        self.timer.start(max(0, int(delay * 1000 + 0.999)))
+
+    def _run(self):
+        self.wakeups += 1
+        due = []
+        with self.lock:
+            # Everything due now, or close enough to share this wake
+            limit = time.monotonic() + self.coalesce
+            while self.heap and self.heap[0].deadline <= limit:
+                entry = heapq.heappop(self.heap)
+                if entry.cancelled:
+                    continue
+                if entry.name is not None and self.named.get(entry.name) is entry:
+                    del self.named[entry.name]
+                due.append(entry)
+        for entry in due:
+            if not entry.cancelled:
+                entry.fn(*entry.args)
+        self._rearm()
+
+
+# Shared by control.py and model.py -- created on the Qt thread at import
+scheduler = Scheduler()
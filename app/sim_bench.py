@@ -0,0 +1,154 @@
+"""Plug-event latency and throughput against the simulated board.
+
+Runs the real MainWindow and Model on sim_mcp23017 and measures, for each
+plug/unplug, the time from the tip changing to control.py handing the
+settled edge on (handlePinEdge). Needs PyQt5 and python-vlc, not a Pi.
+
+    QT_QPA_PLATFORM=offscreen python sim_bench.py --events 200 --bounces 3
+    python sim_bench.py --input poll --poll-hz 500
+    SB_TOPOLOGY=topology-40.json python sim_bench.py
+
+--console two-line runs control_single.py instead, plugging each cord
+on a random line, and checks the (plugged, line) it decodes from the
+tip/ring scan against what was plugged.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+
+from PyQt5 import QtWidgets as qtw
+from PyQt5 import QtCore as qtc
+
+from hardware import SimHardware
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--events", type=int, default=100)
+    parser.add_argument("--bounces", type=int, default=2,
+                        help="chatter edges before each plug settles")
+    parser.add_argument("--bounce-ms", type=float, default=3.0)
+    parser.add_argument("--latency-ms", type=float, default=0.1)
+    parser.add_argument("--byte-us", type=float, default=90)
+    parser.add_argument("--input", choices=("interrupt", "poll"), default="interrupt")
+    parser.add_argument("--poll-hz", type=float,
+                        help="polling rate for --input poll (SB_POLL_HZ)")
+    parser.add_argument("--console", choices=("multi", "two-line"), default="multi",
+                        help="two-line: control_single.py and its line decoding")
+    args = parser.parse_args()
+
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    app = qtw.QApplication([])
+    if args.console == "two-line":
+        sys.exit(checkLines(app, args))
+    # Imported after the QApplication exists -- Model builds QTimers
+    from control import MainWindow
+
+    if args.poll_hz:
+        os.environ["SB_POLL_HZ"] = str(args.poll_hz)
+    hardware = SimHardware(latencyMs=args.latency_ms, byteUs=args.byte_us)
+    win = MainWindow(hardware, args.input)
+    # Keep the game logic out of it, only the input path is measured
+    win.awaitingRestart = True
+
+    edgeSeen = threading.Event()
+    edgeTimes = []
+    originalHandlePinEdge = win.handlePinEdge
+
+    def timedHandlePinEdge(pinIdx, isPlugIn):
+        edgeTimes.append(time.monotonic())
+        edgeSeen.set()
+        originalHandlePinEdge(pinIdx, isPlugIn)
+    win.handlePinEdge = timedHandlePinEdge
+
+    latencies = []
+
+    def drive():
+        rng = random.Random(1)
+        startTime = time.monotonic()
+        for eventIdx in range(args.events):
+            jackIdx = rng.randrange(hardware.topology.jackCount)
+            for plugIn in (True, False):
+                # Contact chatter before the plug settles
+                for bounce in range(args.bounces):
+                    (hardware.plug if bounce % 2 == (0 if plugIn else 1) else hardware.unplug)(jackIdx)
+                    time.sleep(args.bounce_ms / 1000)
+                edgeSeen.clear()
+                settledAt = time.monotonic()
+                (hardware.plug if plugIn else hardware.unplug)(jackIdx)
+                if not edgeSeen.wait(2.0):
+                    print(f" * jack {jackIdx} plugIn={plugIn} never arrived")
+                    continue
+                latencies.append((edgeTimes[-1] - settledAt) * 1000)
+        elapsed = time.monotonic() - startTime
+        print(f"edges: {len(latencies)} in {elapsed:.2f} s "
+              f"({len(latencies) / elapsed:.1f}/s)")
+        if latencies:
+            print(f"settle to handled ms: mean {statistics.mean(latencies):.1f} "
+                  f"p50 {percentile(latencies, 50):.1f} p95 {percentile(latencies, 95):.1f} "
+                  f"max {max(latencies):.1f}")
+        print(f"bus transactions: {hardware.busTransactions()}")
+        # The i2c and poller reports follow in the latency dump at exit
+        qtc.QMetaObject.invokeMethod(app, "quit", qtc.Qt.QueuedConnection)
+
+    threading.Thread(target=drive, daemon=True).start()
+    sys.exit(app.exec_())
+
+
+def checkLines(app, args):
+    """control_single.py on the sim: plug each cord on a random line and
+    compare the jack and line handed to the model with what was plugged.
+    """
+    from control_single import MainWindow as TwoLineWindow
+
+    hardware = SimHardware(latencyMs=args.latency_ms, byteUs=args.byte_us)
+    win = TwoLineWindow(hardware)
+    # Keep the game logic out of it, only the decoding is checked
+    win.plugInToHandle.disconnect()
+    seen = []
+    edgeSeen = threading.Event()
+
+    def recordPlugIn(pinIdx, lineIdx):
+        seen.append((pinIdx, lineIdx))
+        edgeSeen.set()
+    win.plugInToHandle.connect(recordPlugIn)
+    results = {"ok": 0, "wrong": 0, "missed": 0}
+
+    def drive():
+        rng = random.Random(1)
+        for eventIdx in range(args.events):
+            jackIdx = rng.randrange(hardware.topology.jackCount)
+            lineIdx = rng.randrange(2)
+            edgeSeen.clear()
+            hardware.plug(jackIdx, lineIdx)
+            if not edgeSeen.wait(2.0):
+                results["missed"] += 1
+            elif seen[-1] == (jackIdx, lineIdx):
+                results["ok"] += 1
+            else:
+                print(f" * plugged {jackIdx} on line {lineIdx}, decoded {seen[-1]}")
+                results["wrong"] += 1
+            # Past the bounce wait and its wiggle guard before unplugging
+            time.sleep(0.1)
+            hardware.unplug(jackIdx)
+            time.sleep(0.45)
+        print(f"two-line decode: {results['ok']} right, {results['wrong']} wrong, "
+              f"{results['missed']} missed of {args.events} plug-ins")
+        qtc.QMetaObject.invokeMethod(app, "quit", qtc.Qt.QueuedConnection)
+
+    threading.Thread(target=drive, daemon=True).start()
+    app.exec_()
+    return 1 if results["wrong"] or results["missed"] else 0
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,286 @@
+"""Pure-Python MCP23017 for running the switchboard off the Pi.
+
+Models the register file in IOCON.BANK = 0 layout with the behaviour the
+app relies on: IODIR/GPPU/IPOL, GPINTEN with INTCON/DEFVAL compare,
+INTF and INTCAP latched at the first change and cleared by reading INTCAP
+or GPIO, OLAT behind GPIO writes, and a mirrored INT output that calls the
+attached interrupt line on every level change. Every bus transaction
+sleeps for a configurable latency so timing work sees a realistic bus.
+
+The property names match adafruit_mcp230xx's MCP23017, and _device is a
+stand-in for adafruit_bus_device's I2CDevice, so JackBank and LedBank use
+it unchanged.
+"""
+import threading
+import time
+
+IODIRA = 0x00
+IPOLA = 0x02
+GPINTENA = 0x04
+DEFVALA = 0x06
+INTCONA = 0x08
+IOCON = 0x0A
+GPPUA = 0x0C
+INTFA = 0x0E
+INTCAPA = 0x10
+GPIOA = 0x12
+OLATA = 0x14
+_REGISTER_COUNT = 0x16
+
+# 100 kHz bus: start + address + ack is roughly a byte's worth of clocks
+DEFAULT_LATENCY_MS = 0.1
+DEFAULT_BYTE_US = 90
+
+
+class SimI2CDevice:
+    """Just enough of adafruit_bus_device.I2CDevice for the sim chip."""
+    def __init__(self, chip):
+        self.chip = chip
+
+    def __enter__(self):
+        self.chip.lock.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.chip.lock.release()
+        # Interrupt line callbacks run outside the chip lock
+        self.chip.notifyInterrupt()
+        return False
+
+    def write(self, buf, start=0, end=None):
+        data = bytes(buf[start:end])
+        self.chip.busDelay(len(data))
+        if len(data) > 1:
+            self.chip.writeRegisters(data[0], data[1:])
+
+    def write_then_readinto(self, outBuf, inBuf, out_start=0, out_end=None,
+                            in_start=0, in_end=None):
+        register = outBuf[out_start]
+        if in_end is None:
+            in_end = len(inBuf)
+        count = in_end - in_start
+        self.chip.busDelay(1 + count)
+        inBuf[in_start:in_end] = self.chip.readRegisters(register, count)
+
+
+class SimMCP23017:
+    def __init__(self, address=0x20, latencyMs=DEFAULT_LATENCY_MS,
+                 byteUs=DEFAULT_BYTE_US):
+        self.address = address
+        self.latency = latencyMs / 1000
+        self.byteTime = byteUs / 1000000
+        self.lock = threading.RLock()
+        self.regs = bytearray(_REGISTER_COUNT)
+        # Power-on: all inputs
+        self.regs[IODIRA] = 0xFF
+        self.regs[IODIRA + 1] = 0xFF
+        # Level driven onto each pin from outside (plugs, buttons).
+        # None means floating, which reads high with pull-up, low without
+        self.driven = [None] * 16
+        self.intAsserted = False
+        # INT levels not yet reported to the interrupt line, in order
+        self._pendingLevels = []
+        self.interruptLine = None
+        self.transactions = 0
+        self._device = SimI2CDevice(self)
+
+    # ---- bus timing ----
+    def busDelay(self, byteCount):
+        self.transactions += 1
+        delay = self.latency + byteCount * self.byteTime
+        if delay > 0:
+            time.sleep(delay)
+
+    # ---- register file ----
+    def _u16(self, register):
+        return self.regs[register] | self.regs[register + 1] << 8
+
+    def _setU16(self, register, value):
+        self.regs[register] = value & 0xFF
+        self.regs[register + 1] = (value >> 8) & 0xFF
+
+    def portValue(self):
+        """What GPIO reads right now: pin level for inputs (through
+        IPOL), latch for outputs.
+        """
+        iodir = self._u16(IODIRA)
+        gppu = self._u16(GPPUA)
+        olat = self._u16(OLATA)
+        value = 0
+        for pin in range(16):
+            bit = 1 << pin
+            if iodir & bit:
+                level = self.driven[pin]
+                if level is None:
+                    level = bool(gppu & bit)
+                if level:
+                    value |= bit
+            elif olat & bit:
+                value |= bit
+        return value ^ (self._u16(IPOLA) & iodir)
+
+    def readRegisters(self, register, count):
+        out = bytearray(count)
+        for offset in range(count):
+            reg = (register + offset) % _REGISTER_COUNT
+            if reg in (GPIOA, GPIOA + 1):
+                self._setU16(GPIOA, self.portValue())
+            out[offset] = self.regs[reg]
+            # Reading INTCAP or GPIO clears the interrupt
+            if reg in (INTCAPA, INTCAPA + 1, GPIOA, GPIOA + 1):
+                self._clearInterrupt()
+        return out
+
+    def writeRegisters(self, register, data):
+        for offset, byte in enumerate(data):
+            reg = (register + offset) % _REGISTER_COUNT
+            if reg in (INTFA, INTFA + 1, INTCAPA, INTCAPA + 1):
+                continue  # read-only
+            if reg in (GPIOA, GPIOA + 1):
+                reg += OLATA - GPIOA
+            if reg == IOCON + 1:
+                reg = IOCON  # IOCON is one register at two addresses
+            self.regs[reg] = byte
+
+    # ---- interrupts ----
+    def _clearInterrupt(self):
+        self._setU16(INTFA, 0)
+        self._updateIntLine()
+
+    def _updateIntLine(self):
+        asserted = self._u16(INTFA) != 0
+        if asserted != self.intAsserted:
+            self.intAsserted = asserted
+            # Kept, so a clear and a re-assert before the next notify
+            # are still two edges rather than none
+            self._pendingLevels.append(not asserted)
+
+    def notifyInterrupt(self):
+        # INT is open drain active low, and mirrored, so one line covers
+        # both ports. Like GPIO.BOTH, every level change is reported
+        with self.lock:
+            levels = self._pendingLevels
+            self._pendingLevels = []
+        if self.interruptLine is not None:
+            for level in levels:
+                self.interruptLine.levelChanged(level)
+
+    def drive(self, pin, level):
+        """Outside world sets a pin: False grounds it (plug tip), True
+        pulls it high, None lets it float.
+        """
+        with self.lock:
+            before = self.portValue()
+            self.driven[pin] = level
+            after = self.portValue()
+            enabled = self._u16(GPINTENA) & self._u16(IODIRA)
+            intcon = self._u16(INTCONA)
+            # INTCON 1: compare to DEFVAL, 0: interrupt on any change
+            compared = (after ^ self._u16(DEFVALA)) & intcon
+            changed = (after ^ before) & ~intcon
+            triggered = (compared | changed) & enabled
+            if triggered:
+                if self._u16(INTFA) == 0:
+                    # Capture only on the first change until cleared
+                    self._setU16(INTCAPA, after)
+                self._setU16(INTFA, self._u16(INTFA) | triggered)
+                self._updateIntLine()
+        self.notifyInterrupt()
+
+    # ---- adafruit_mcp230xx MCP23017 API ----
+    def _read_u16le(self, register):
+        buf = bytearray(2)
+        with self._device as i2c:
+            i2c.write_then_readinto(bytes([register]), buf)
+        return buf[0] | buf[1] << 8
+
+    def _write_u16le(self, register, value):
+        with self._device as i2c:
+            i2c.write(bytes([register, value & 0xFF, (value >> 8) & 0xFF]))
+
+    def _read_u8(self, register):
+        buf = bytearray(1)
+        with self._device as i2c:
+            i2c.write_then_readinto(bytes([register]), buf)
+        return buf[0]
+
+    def _write_u8(self, register, value):
+        with self._device as i2c:
+            i2c.write(bytes([register, value & 0xFF]))
+
+    @property
+    def gpio(self):
+        return self._read_u16le(GPIOA)
+
+    @gpio.setter
+    def gpio(self, value):
+        self._write_u16le(GPIOA, value)
+
+    @property
+    def iodir(self):
+        return self._read_u16le(IODIRA)
+
+    @iodir.setter
+    def iodir(self, value):
+        self._write_u16le(IODIRA, value)
+
+    @property
+    def gppu(self):
+        return self._read_u16le(GPPUA)
+
+    @gppu.setter
+    def gppu(self, value):
+        self._write_u16le(GPPUA, value)
+
+    @property
+    def ipol(self):
+        return self._read_u16le(IPOLA)
+
+    @ipol.setter
+    def ipol(self, value):
+        self._write_u16le(IPOLA, value)
+
+    @property
+    def interrupt_enable(self):
+        return self._read_u16le(GPINTENA)
+
+    @interrupt_enable.setter
+    def interrupt_enable(self, value):
+        self._write_u16le(GPINTENA, value)
+
+    @property
+    def interrupt_configuration(self):
+        return self._read_u16le(INTCONA)
+
+    @interrupt_configuration.setter
+    def interrupt_configuration(self, value):
+        self._write_u16le(INTCONA, value)
+
+    @property
+    def default_value(self):
+        return self._read_u16le(DEFVALA)
+
+    @default_value.setter
+    def default_value(self, value):
+        self._write_u16le(DEFVALA, value)
+
+    @property
+    def io_control(self):
+        return self._read_u8(IOCON)
+
+    @io_control.setter
+    def io_control(self, value):
+        self._write_u8(IOCON, value)
+
+    @property
+    def int_flag(self):
+        intf = self._read_u16le(INTFA)
+        return [pin for pin in range(16) if intf & (1 << pin)]
+
+    @property
+    def int_cap(self):
+        intcap = self._read_u16le(INTCAPA)
+        return [(intcap >> pin) & 1 for pin in range(16)]
+
+    def clear_ints(self):
+        self._read_u16le(INTCAPA)
@@ -0,0 +1,189 @@
+"""Where every jack, button and LED is on the board.
+
+A topology lists the input (tip) expanders and LED expanders -- each an
+MCP23017 at a bus and address, input chips with the Pi GPIO their INT
+is wired to -- and maps:
+  - jack j  -> (input chip, pin), in order
+  - button role ("start") -> (input chip, pin)
+  - LED i   -> (LED chip, pin), in order
+The rest of the app only sees global bit numbers: jack j is bit j of the
+port, buttons come after the jacks in the order they are listed, LED i is
+bit i of the LED mask. Pick a board with SB_TOPOLOGY=<file.json>, see
+topology-40.json; without it the board is the original one: tip chip
+0x20 (jacks on pins 0-11, Start on 13) and LED chip 0x21, bus 1, INT on
+GPIO 17.
+"""
+import json
+import os
+from collections import namedtuple
+
+DEFAULT_BUS = 1
+DEFAULT_INT_PIN = 17
+
+
+class ChipSpec(namedtuple("ChipSpec", "bus address intPin")):
+    __slots__ = ()
+
+    def __repr__(self):
+        return f"bus {self.bus} 0x{self.address:02x}"
+
+
+def _runs(pinsToBits):
+    """[(pin, bit)] as (firstPin, count, firstBit) runs of consecutive
+    pins on consecutive bits, so moving a chip's bits is a few shifts.
+    """
+    runs = []
+    for pin, bit in sorted(pinsToBits):
+        if runs:
+            firstPin, count, firstBit = runs[-1]
+            if pin == firstPin + count and bit == firstBit + count:
+                runs[-1] = (firstPin, count + 1, firstBit)
+                continue
+        runs.append((pin, 1, bit))
+    return tuple(runs)
+
+
+def gather(runs, port):
+    """Chip port bits -> their global bits."""
+    bits = 0
+    for firstPin, count, firstBit in runs:
+        bits |= ((port >> firstPin) & ((1 << count) - 1)) << firstBit
+    return bits
+
+
+def scatter(runs, bits):
+    """Global bits -> the chip's port bits."""
+    port = 0
+    for firstPin, count, firstBit in runs:
+        port |= ((bits >> firstBit) & ((1 << count) - 1)) << firstPin
+    return port
+
+
+class BoardTopology:
+    def __init__(self, inputChips, ledChips, jacks, leds, buttons):
+        """inputChips and ledChips are ChipSpecs. jacks and leds are
+        (chipIdx, pin) lists, buttons a {role: (chipIdx, pin)} dict.
+        """
+        self.inputChips = list(inputChips)
+        self.ledChips = list(ledChips)
+        self.jacks = list(jacks)
+        self.leds = list(leds)
+        self.buttons = dict(buttons)
+        self.jackCount = len(self.jacks)
+        self.jackMask = (1 << self.jackCount) - 1
+        self.ledCount = len(self.leds)
+        self.ledMask = (1 << self.ledCount) - 1
+        self.buttonBits = {role: self.jackCount + idx
+                           for idx, role in enumerate(self.buttons)}
+        self._check()
+
+        # Per chip: the runs that move its pins to global bits and back
+        inputPins = [[] for _ in self.inputChips]
+        for jackIdx, (chipIdx, pin) in enumerate(self.jacks):
+            inputPins[chipIdx].append((pin, jackIdx))
+        for role, (chipIdx, pin) in self.buttons.items():
+            inputPins[chipIdx].append((pin, self.buttonBits[role]))
+        self.inputRuns = [_runs(pins) for pins in inputPins]
+        # Global bits each input chip answers for
+        self.inputMasks = [gather(runs, 0xFFFF) for runs in self.inputRuns]
+        ledPins = [[] for _ in self.ledChips]
+        for ledIdx, (chipIdx, pin) in enumerate(self.leds):
+            ledPins[chipIdx].append((pin, ledIdx))
+        self.ledRuns = [_runs(pins) for pins in ledPins]
+        # Output pins on each LED chip
+        self.ledPinMasks = [scatter(runs, self.ledMask) for runs in self.ledRuns]
+
+    def _check(self):
+        used = set()
+        for kind, chips, pins in (("jack", self.inputChips, self.jacks),
+                                  ("button", self.inputChips, self.buttons.values()),
+                                  ("led", self.ledChips, self.leds)):
+            for chipIdx, pin in pins:
+                if not 0 <= chipIdx < len(chips) or not 0 <= pin < 16:
+                    raise ValueError(f"topology: {kind} on chip {chipIdx} pin {pin}"
+                                     f" is not on the board")
+                key = (kind == "led", chipIdx, pin)
+                if key in used:
+                    raise ValueError(f"topology: chip {chipIdx} pin {pin} used twice")
+                used.add(key)
+        for chip in self.inputChips:
+            if chip.intPin is None:
+                raise ValueError(f"topology: input chip {chip} has no intPin")
+
+    @property
+    def buses(self):
+        return sorted({chip.bus for chip in self.inputChips + self.ledChips})
+
+    @property
+    def intPins(self):
+        return sorted({chip.intPin for chip in self.inputChips})
+
+    def inputsOnPin(self, intPin):
+        """Input chips whose INT is wired to this Pi GPIO."""
+        return [chipIdx for chipIdx, chip in enumerate(self.inputChips)
+                if chip.intPin == intPin]
+
+    def buttonBit(self, role):
+        return self.buttonBits[role]
+
+    def jackPin(self, jackIdx):
+        """(input chip, pin) of a jack."""
+        return self.jacks[jackIdx]
+
+    def describe(self):
+        return (f"{self.jackCount} jacks on {len(self.inputChips)} input chips, "
+                f"{self.ledCount} LEDs on {len(self.ledChips)} LED chips, "
+                f"buses {self.buses}, INT on GPIO {self.intPins}")
+
+    # ---- json ----
+    @classmethod
+    def fromDict(cls, spec):
+        def chips(entries, needInt):
+            return [ChipSpec(entry.get("bus", DEFAULT_BUS), _address(entry["address"]),
+                             entry.get("intPin", DEFAULT_INT_PIN) if needInt else None)
+                    for entry in entries]
+
+        return cls(chips(spec["inputChips"], True), chips(spec["ledChips"], False),
+                   _pinList(spec["jacks"]), _pinList(spec["leds"]),
+                   {role: tuple(where) for role, where in spec.get("buttons", {}).items()})
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls.fromDict(json.load(f))
+
+
+def _address(value):
+    return int(value, 0) if isinstance(value, str) else value
+
+
+def _pinList(entries):
+    """[chip, pin] pairs, or {"chip", "first", "count"} ranges, in order."""
+    pins = []
+    for entry in entries:
+        if isinstance(entry, dict):
+            first = entry.get("first", 0)
+            pins.extend((entry["chip"], pin) for pin in range(first, first + entry["count"]))
+        else:
+            pins.append(tuple(entry))
+    return pins
+
+
+def defaultTopology():
+    """The 12-jack board everything was written for."""
+    return BoardTopology(
+        [ChipSpec(DEFAULT_BUS, 0x20, DEFAULT_INT_PIN)],
+        [ChipSpec(DEFAULT_BUS, 0x21, None)],
+        jacks=[(0, pin) for pin in range(12)],
+        leds=[(0, pin) for pin in range(12)],
+        buttons={"start": (0, 13)})
+
+
+def loadTopology(path=None):
+    if path is None:
+        path = os.environ.get("SB_TOPOLOGY")
+    if not path:
+        return defaultTopology()
+    topology = BoardTopology.load(path)
+    print(f" * topology {path}: {topology.describe()}")
+    return topology